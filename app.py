@@ -2,9 +2,13 @@
 import streamlit as st
 import pandas as pd
 import os
+import hashlib
 from datetime import datetime
 from utils.data_processor import DataProcessor
 from utils.auth import AuthHandler
+from utils.history_store import HistoryStore
+from utils.result_cache import ResultCache
+from utils.job_runner import JobRunner
 import base64
 
 def load_css(css_file):
@@ -15,9 +19,6 @@ def load_css(css_file):
     except Exception as e:
         st.error(f"Error loading CSS file: {str(e)}")
 
-# Initialize handlers
-auth_handler = AuthHandler()
-
 # Configure page
 st.set_page_config(
     page_title="Sotheby's Address Validator",
@@ -29,21 +30,6 @@ st.set_page_config(
 load_css('static/styles.css')
 
 # Helper functions
-def safe_read_excel(file):
-    """Safely read Excel file, handling empty files and other errors."""
-    try:
-        return pd.read_excel(file)
-    except (pd.errors.EmptyDataError, ValueError):
-        st.error("The uploaded file appears to be empty or invalid.")
-        return None
-    except Exception as e:
-        st.error(f"Error reading file: {str(e)}")
-        return None
-
-def get_readable_timestamp():
-    """Get current timestamp in readable format."""
-    return datetime.now().strftime("%B %d, %Y at %I:%M %p")
-
 def get_file_timestamp():
     """Get timestamp for file naming."""
     return datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -68,7 +54,57 @@ def display_logo(context='main'):
 
 # Configure valid property classes
 VALID_PROPERTY_CLASSES = ["CD", "B9", "B2", "B3", "CO", "C0", "B1", "C1", "C3", "A9", "C2"]
-data_processor = DataProcessor(VALID_PROPERTY_CLASSES)
+
+# Seconds between progress polls of a running job, and View History entries per page
+JOB_POLL_SECONDS = 1.0
+HISTORY_PAGE_SIZE = 20
+
+# Handlers are process-wide resources so reruns skip dotenv, cache and bcrypt setup
+@st.cache_resource
+def get_auth_handler():
+    """Shared AuthHandler for every session."""
+    return AuthHandler()
+
+@st.cache_resource
+def get_data_processor():
+    """Shared DataProcessor (and address cache) for every session."""
+    return DataProcessor(VALID_PROPERTY_CLASSES)
+
+@st.cache_resource
+def get_history_store():
+    """Shared HistoryStore for every session."""
+    return HistoryStore()
+
+@st.cache_resource
+def get_result_cache():
+    """Size-bounded cache of processed results keyed by upload content hash."""
+    return ResultCache(max_entries=8, max_bytes=512 * 1024 * 1024)
+
+@st.cache_resource
+def get_job_runner():
+    """Background worker pool that runs uploads through the pipeline."""
+    return JobRunner(get_data_processor(), max_workers=2)
+
+auth_handler = get_auth_handler()
+data_processor = get_data_processor()
+history_store = get_history_store()
+result_cache = get_result_cache()
+job_runner = get_job_runner()
+
+def store_job_result(job, processed_data, run_stats):
+    """Save a finished job's output to history and the result cache (worker thread)."""
+    if processed_data is None or processed_data.empty:
+        return None
+    base_name = os.path.splitext(job['filename'])[0]
+    processed_basename = f"{base_name}_processed_{get_file_timestamp()}"
+    saved_filename = history_store.save(processed_data, processed_basename)
+    result_cache.put(job['key'], processed_data, run_stats, f"{processed_basename}.csv")
+    return saved_filename
+
+@st.cache_data(max_entries=10)
+def load_history_file(filename, timestamp):
+    """Load a stored output once per file version."""
+    return history_store.load(filename)
 
 # Authentication check
 if 'user_token' not in st.session_state:
@@ -182,208 +218,279 @@ if page == 'Process New Data':
     uploaded_file = st.file_uploader("Upload Property Shark Data Export (Excel)", type="xlsx", key="property")
     
     
+    # The job id lives in the URL so a refreshed page reattaches to its run
+    job_id = st.experimental_get_query_params().get('job', [None])[0]
+    result_key = None
+    
     if uploaded_file:
+        upload_bytes = uploaded_file.getvalue()
+        result_key = hashlib.sha256(upload_bytes).hexdigest()
+        if result_key not in result_cache:
+            job_id = job_runner.submit(
+                upload_bytes, uploaded_file.name, key=result_key, on_complete=store_job_result
+            )
+            st.experimental_set_query_params(job=job_id)
+    
+    job = job_runner.get(job_id) if job_id else None
+    if job and not uploaded_file:
+        result_key = job['key']
+    elif job and job['key'] != result_key:
+        job = None
+    
+    if result_key:
         # Create a progress message container
         progress_message = st.empty()
-        progress_message.info("Starting to process your file... 🚀")
         
-        input_data = safe_read_excel(uploaded_file)
-        if input_data is None or input_data.empty:
-            st.error("Unable to process the uploaded file. Please ensure it contains valid data. 📋")
-        else:
-            try:
-                file_timestamp = get_file_timestamp()
-                readable_timestamp = get_readable_timestamp()
-                original_filename = uploaded_file.name
-                
-                base_name = os.path.splitext(original_filename)[0]
-                processed_filename = f"{base_name}_processed_{file_timestamp}.csv"
-                
-                # Create a status container to show real-time updates
-                status_container = st.empty()
-                
-                # Define the callback function
-                def status_callback(message):
+        try:
+            # Create a status container to show real-time updates
+            status_container = st.empty()
+            
+            # Results are memoized by upload content so widget reruns skip processing
+            cached_result = result_cache.get(result_key)
+            processed_data, run_stats = None, None
+            
+            if cached_result is not None:
+                processed_data, run_stats, processed_filename = cached_result
+            elif job and job['status'] in ('queued', 'running'):
+                # Poll the job store while the pipeline runs in the background
+                progress_message.info(f"{job['stage']}... 🚀")
+                eta = f"About {int(job['eta_seconds'])}s remaining" if job['eta_seconds'] else ""
+                st.progress(int(job['percent']), text=eta)
+                if job['message']:
                     status_container.markdown(f"""
                         <div style="color: #FFFFFF;">
-                            {message}
+                            {job['message']}
                         </div>
                     """, unsafe_allow_html=True)
+                # Rerun on the next poll, or as soon as the job finishes
+                job_runner.wait(job['id'], JOB_POLL_SECONDS)
+                st.rerun()
+            elif job and job['status'] == 'failed':
+                progress_message.error(f"Oops! Something went wrong while processing your file: {job['error']} ❌")
+                if uploaded_file and st.button("Retry processing"):
+                    job_id = job_runner.submit(
+                        upload_bytes, uploaded_file.name, key=result_key,
+                        on_complete=store_job_result, force=True
+                    )
+                    st.experimental_set_query_params(job=job_id)
+                    st.rerun()
+                st.stop()
+            elif job and job['status'] == 'completed':
+                run_stats = job['run_stats']
+                if job['result']:
+                    # Evicted from the result cache; reload the saved output
+                    processed_data = history_store.load(job['result'])
+                    processed_filename = history_store.csv_filename(job['result'])
+                    result_cache.put(result_key, processed_data, run_stats, processed_filename)
+            
+            if run_stats is None:
+                progress_message.error("This processing run is no longer available. Please upload the file again. 📋")
+            elif run_stats['initial_count'] == 0:
+                progress_message.error("Unable to process the uploaded file. Please ensure it contains valid data. 📋")
+            elif processed_data is None or processed_data.empty:
+                progress_message.error("No valid data was found after processing. Please check your input file. 🚫")
+            else:
+                # Calculate statistics
+                processed_records = len(processed_data)
+                total_records = run_stats['initial_count']
+                removed_records = total_records - processed_records
                 
-                # Process the data with status updates
-                processed_data = data_processor.process_file(uploaded_file, status_callback)
+                # Geocoding request metrics, when the run made any requests
+                geocoding_line = ""
+                geocoding = run_stats.get('geocoding')
+                if geocoding and geocoding['requests']:
+                    geocoding_line = (
+                        f"🌐 Geocoding requests: {geocoding['requests']} "
+                        f"({geocoding['pacing_wait_seconds']:.1f}s rate limit wait, "
+                        f"{geocoding['backoff_seconds']:.1f}s backoff)<br>"
+                    )
+                tiers = run_stats.get('resolution_tiers')
+                if tiers:
+                    geocoding_line += "🧭 Resolved by tier: " + ", ".join(
+                        f"{tier} {count}" for tier, count in tiers.items() if count
+                    ) + "<br>"
                 
-                if processed_data is None or processed_data.empty:
-                    progress_message.error("No valid data was found after processing. Please check your input file. 🚫")
-                else:
-                    # Calculate statistics
-                    processed_records = len(processed_data)
-                    total_records = len(input_data)
-                    removed_records = total_records - processed_records
-                    
-                    # Update final status
-                    status_container.markdown(f"""
-                        <div style="color: #FFFFFF;">
-                            ✅ Processing complete!<br>
-                            📊 Original records: {total_records}<br>
-                            🎯 Valid addresses: {processed_records}<br>
-                            🗑️ Removed duplicates/invalid: {removed_records}<br>
-                        </div>
-                    """, unsafe_allow_html=True)
-                    
-# Replace the section after saving the processed data and before the download button
-                    # Save the processed data
-                    os.makedirs("data/outputs", exist_ok=True)
-                    output_path = os.path.join("data/outputs", processed_filename)
-                    processed_data.to_csv(output_path, index=False)
-                    
-                    # Clear the progress message
-                    progress_message.success("✨ Processing complete! Your addresses have been verified and standardized.")
-                    
-                    # Show the results
-                    st.markdown('<div class="standard-text">✅ Verified Address List</div>', unsafe_allow_html=True)
-                    st.markdown('<div class="standard-text-dark">', unsafe_allow_html=True)
-                    
-                    # Add filter options
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        search_term = st.text_input("🔍 Search addresses", "")
-                    with col2:
-                        property_class = st.selectbox(
-                            "📋 Filter by Property Class",
-                            options=["All"] + list(data_processor.property_class_descriptions.keys()),
-                            format_func=lambda x: f"{x} - {data_processor.property_class_descriptions.get(x, '')}" if x != "All" else "All Classes"
-                        )
-                    
-                    # Filter the dataframe based on search term and property class
-                    filtered_df = processed_data.copy()
-                    if search_term:
-                        filtered_df = filtered_df[filtered_df["Full Address"].str.contains(search_term, case=False, na=False)]
-                    if property_class != "All":
-                        filtered_df = filtered_df[filtered_df["Property class"] == property_class]
-                    
-                    # Show property class distribution
-                    st.markdown("""
-                        <div style="background-color: rgba(255, 255, 255, 0.1); padding: 15px; border-radius: 5px; margin: 10px 0;">
-                            <h4 style="color: #FFFFFF; margin-bottom: 10px;">Property Class Distribution</h4>
-                    """, unsafe_allow_html=True)
-                    
-                    # Create property class summary
-                    class_summary = processed_data["Property class"].value_counts()
-                    total_records = len(processed_data)
-                    
-                    for cls, count in class_summary.items():
-                        percentage = (count / total_records) * 100
-                        description = data_processor.property_class_descriptions.get(cls, "Unknown")
-                        st.markdown(f"""
-                            <div style="color: #FFFFFF; margin-bottom: 5px;">
-                                {cls} - {description}: {count} records ({percentage:.1f}%)
-                            </div>
-                        """, unsafe_allow_html=True)
-                    
-                    st.markdown("</div>", unsafe_allow_html=True)
-                    
-                    # Display the dataframe with a note about sorting
-                    st.markdown("""
-                        <div style="color: #FFFFFF; font-size: 0.8em; margin-bottom: 10px;">
-                            💡 Tip: Click on any column header to sort the data
-                        </div>
-                    """, unsafe_allow_html=True)
-                    
-
-                    # Show the dataframe with all relevant columns
-                    display_columns = [
-                        "Full Address",
-                        "Address",
-                        "City",
-                        "State",
-                        "Zipcode",
-                        "Property class",
-                        "Property Class Description",
-                        "Processed Date"
-                    ]
-
-                    st.dataframe(
-                        filtered_df[display_columns],
-                        height=400
+                # Update final status
+                status_container.markdown(f"""
+                    <div style="color: #FFFFFF;">
+                        ✅ Processing complete!<br>
+                        📊 Original records: {total_records}<br>
+                        🎯 Valid addresses: {processed_records}<br>
+                        🗑️ Removed duplicates/invalid: {removed_records}<br>
+                        {geocoding_line}
+                    </div>
+                """, unsafe_allow_html=True)
+                
+                # Clear the progress message
+                progress_message.success("✨ Processing complete! Your addresses have been verified and standardized.")
+                
+                # Show the results
+                st.markdown('<div class="standard-text">✅ Verified Address List</div>', unsafe_allow_html=True)
+                st.markdown('<div class="standard-text-dark">', unsafe_allow_html=True)
+                
+                # Add filter options
+                col1, col2 = st.columns(2)
+                with col1:
+                    search_term = st.text_input("🔍 Search addresses", "")
+                with col2:
+                    property_class = st.selectbox(
+                        "📋 Filter by Property Class",
+                        options=["All"] + list(data_processor.property_class_descriptions.keys()),
+                        format_func=lambda x: f"{x} - {data_processor.property_class_descriptions.get(x, '')}" if x != "All" else "All Classes"
                     )
-
-                    # Add column descriptions
-                    st.markdown("""
-                        <div style="background-color: rgba(255, 255, 255, 0.1); padding: 15px; border-radius: 5px; margin-top: 20px;">
-                            <h4 style="color: #FFFFFF;">Column Descriptions:</h4>
-                            <ul style="color: #FFFFFF;">
-                                <li><strong>Full Address:</strong> Complete standardized address</li>
-                                <li><strong>Address:</strong> Street address component</li>
-                                <li><strong>City:</strong> City/locality component</li>
-                                <li><strong>State:</strong> State/region component</li>
-                                <li><strong>Zipcode:</strong> Postal code component</li>
-                                <li><strong>Property class:</strong> Property classification code</li>
-                                <li><strong>Property Class Description:</strong> Detailed property type description</li>
-                            </ul>
+                
+                # Filter the cached dataframe; masks build new views, no copy needed
+                filtered_df = processed_data
+                if search_term:
+                    filtered_df = filtered_df[filtered_df["Full Address"].str.contains(search_term, case=False, na=False, regex=False)]
+                if property_class != "All":
+                    filtered_df = filtered_df[filtered_df["Property class"] == property_class]
+                
+                # Show property class distribution
+                st.markdown("""
+                    <div style="background-color: rgba(255, 255, 255, 0.1); padding: 15px; border-radius: 5px; margin: 10px 0;">
+                        <h4 style="color: #FFFFFF; margin-bottom: 10px;">Property Class Distribution</h4>
+                """, unsafe_allow_html=True)
+                
+                # Create property class summary
+                class_summary = processed_data["Property class"].value_counts()
+                total_records = len(processed_data)
+                
+                for cls, count in class_summary.items():
+                    percentage = (count / total_records) * 100
+                    description = data_processor.property_class_descriptions.get(cls, "Unknown")
+                    st.markdown(f"""
+                        <div style="color: #FFFFFF; margin-bottom: 5px;">
+                            {cls} - {description}: {count} records ({percentage:.1f}%)
                         </div>
                     """, unsafe_allow_html=True)
+                
+                st.markdown("</div>", unsafe_allow_html=True)
+                
+                # Display the dataframe with a note about sorting
+                st.markdown("""
+                    <div style="color: #FFFFFF; font-size: 0.8em; margin-bottom: 10px;">
+                        💡 Tip: Click on any column header to sort the data
+                    </div>
+                """, unsafe_allow_html=True)
+                
 
-                    st.markdown('</div>', unsafe_allow_html=True)
+                # Show the dataframe with all relevant columns
+                display_columns = [
+                    "Full Address",
+                    "Address",
+                    "City",
+                    "State",
+                    "Zipcode",
+                    "Property class",
+                    "Property Class Description",
+                    "Processed Date"
+                ]
+
+                st.dataframe(
+                    filtered_df[display_columns],
+                    height=400
+                )
+
+                # Add column descriptions
+                st.markdown("""
+                    <div style="background-color: rgba(255, 255, 255, 0.1); padding: 15px; border-radius: 5px; margin-top: 20px;">
+                        <h4 style="color: #FFFFFF;">Column Descriptions:</h4>
+                        <ul style="color: #FFFFFF;">
+                            <li><strong>Full Address:</strong> Complete standardized address</li>
+                            <li><strong>Address:</strong> Street address component</li>
+                            <li><strong>City:</strong> City/locality component</li>
+                            <li><strong>State:</strong> State/region component</li>
+                            <li><strong>Zipcode:</strong> Postal code component</li>
+                            <li><strong>Property class:</strong> Property classification code</li>
+                            <li><strong>Property Class Description:</strong> Detailed property type description</li>
+                        </ul>
+                    </div>
+                """, unsafe_allow_html=True)
+
+                st.markdown('</div>', unsafe_allow_html=True)
 
-                    
-                    # Add download button with clear instructions
-                    st.markdown("""
-                        <div style="background-color: rgba(255, 255, 255, 0.1); padding: 15px; border-radius: 5px; margin-top: 20px;">
-                            <p style="color: #FFFFFF; margin-bottom: 10px;">
-                                ⬇️ Your processed file is ready for download! 
-                                Click the button below to save it to your computer.
-                            </p>
-                        </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.download_button(
-                        label="📥 Download Processed Address List",
-                        data=processed_data.to_csv(index=False),
-                        file_name=processed_filename,
-                        mime="text/csv",
-                        help="Click to download your processed and verified address list"
-                    )
-                    
-            except Exception as e:
-                progress_message.error(f"Oops! Something went wrong while processing your file. Please try again or contact support if the problem persists. ❌")
-                st.exception(e)
+                
+                # Add download button with clear instructions
+                st.markdown("""
+                    <div style="background-color: rgba(255, 255, 255, 0.1); padding: 15px; border-radius: 5px; margin-top: 20px;">
+                        <p style="color: #FFFFFF; margin-bottom: 10px;">
+                            ⬇️ Your processed file is ready for download! 
+                            Click the button below to save it to your computer.
+                        </p>
+                    </div>
+                """, unsafe_allow_html=True)
+                
+                st.download_button(
+                    label="📥 Download Processed Address List",
+                    data=processed_data.to_csv(index=False),
+                    file_name=processed_filename,
+                    mime="text/csv",
+                    help="Click to download your processed and verified address list"
+                )
+                
+        except Exception as e:
+            progress_message.error(f"Oops! Something went wrong while processing your file. Please try again or contact support if the problem persists. ❌")
+            st.exception(e)
 
 elif page == 'View History':
     st.markdown('<h1 class="standard-text">Processing History</h1>', unsafe_allow_html=True)
     
-    output_dir = "data/outputs"
-    if os.path.exists(output_dir):
-        processed_files = [f for f in os.listdir(output_dir) if f.endswith('.csv')]
+    history_entries = history_store.list_entries()
+    
+    if not history_entries:
+        st.info("No processing history available yet.")
+    else:
+        st.markdown('<h2 class="standard-text">Processed Files</h2>', unsafe_allow_html=True)
+        
+        # Paginate from the metadata index; no output is opened to build the list
+        total_pages = (len(history_entries) - 1) // HISTORY_PAGE_SIZE + 1
+        page_number = st.number_input(
+            f"Page (1-{total_pages})", min_value=1, max_value=total_pages, value=1, step=1
+        )
+        start = (page_number - 1) * HISTORY_PAGE_SIZE
+        
+        if 'history_opened' not in st.session_state:
+            st.session_state.history_opened = set()
         
-        if not processed_files:
-            st.info("No processing history available yet.")
-        else:
-            processed_files.sort(key=lambda x: os.path.getmtime(os.path.join(output_dir, x)), reverse=True)
+        for entry in history_entries[start:start + HISTORY_PAGE_SIZE]:
+            filename = entry['filename']
+            mod_time = datetime.fromtimestamp(entry['timestamp'])
             
-            st.markdown('<h2 class="standard-text">Processed Files</h2>', unsafe_allow_html=True)
-            for filename in processed_files:
-                file_path = os.path.join(output_dir, filename)
-                mod_time = datetime.fromtimestamp(os.path.getmtime(file_path))
+            with st.expander(f"{filename} (Processed on {mod_time.strftime('%B %d, %Y at %I:%M %p')})"):
+                rows = entry['rows'] if entry['rows'] is not None else 'Unknown'
+                st.markdown(f"""
+                    <div style="color: #FFFFFF;">
+                        📊 Records: {rows}<br>
+                        💾 Size: {entry['size_bytes'] / 1024:.1f} KB
+                    </div>
+                """, unsafe_allow_html=True)
+                for cls, count in entry['class_distribution'].items():
+                    description = data_processor.property_class_descriptions.get(cls, "Unknown")
+                    st.markdown(f'<div style="color: #FFFFFF;">{cls} - {description}: {count}</div>', unsafe_allow_html=True)
                 
-                with st.expander(f"{filename} (Processed on {mod_time.strftime('%B %d, %Y at %I:%M %p')})"):
-                    try:
-                        df = pd.read_csv(file_path)
-                        st.markdown('<div class="standard-text-dark">', unsafe_allow_html=True)
-                        st.dataframe(df)
-                        st.markdown('</div>', unsafe_allow_html=True)
-                        
-                        with open(file_path, 'rb') as f:
-                            st.download_button(
-                                label=f"Download {filename}",
-                                data=f,
-                                file_name=filename,
-                                mime="text/csv"
-                            )
-                    except Exception as e:
-                        st.error(f"Error loading file: {str(e)}")
-    else:
-        st.info("No processing history available yet.")
+                # Only load a file's contents once the user opens it
+                if filename not in st.session_state.history_opened:
+                    if st.button("Load data", key=f"load_{filename}"):
+                        st.session_state.history_opened.add(filename)
+                        st.rerun()
+                    continue
+                
+                try:
+                    df = load_history_file(filename, entry['timestamp'])
+                    st.markdown('<div class="standard-text-dark">', unsafe_allow_html=True)
+                    st.dataframe(df)
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    
+                    csv_filename = history_store.csv_filename(filename)
+                    st.download_button(
+                        label=f"Download {csv_filename}",
+                        data=df.to_csv(index=False),
+                        file_name=csv_filename,
+                        mime="text/csv"
+                    )
+                except Exception as e:
+                    st.error(f"Error loading file: {str(e)}")
 
 elif page == 'User Management' and user.get('role') == 'admin':
     st.markdown('<h1 class="standard-text">User Management</h1>', unsafe_allow_html=True)
@@ -0,0 +1,66 @@
+# tests/test_abbreviations.py
+import random
+import re
+import pandas as pd
+import pytest
+from utils.abbreviations import (
+    ADDRESS_ABBREVIATIONS,
+    expand_abbreviations,
+    expand_abbreviations_series,
+    find_unexpanded_abbreviations
+)
+
+# Patterns applied one after another by DataProcessor before the single-pass expander
+BASELINE_PATTERNS = [(fr'\b{abbr}\b', full) for abbr, full in ADDRESS_ABBREVIATIONS.items()]
+BASELINE_SPECIAL_CASES = [
+    (r'Fort Greene Pl\b', 'Fort Greene Place'),
+    (r'Ft Greene Pl\b', 'Fort Greene Place'),
+    (r'Ft. Greene Pl\b', 'Fort Greene Place'),
+    (r'Fort Greene Pl.\b', 'Fort Greene Place'),
+]
+
+WORDS = list(ADDRESS_ABBREVIATIONS) + [
+    '12', '5th', 'Main', 'Street', 'Stanton', 'Nest', 'Fort', 'Greene', 'Broadway',
+    'NEW', 'SWan', 'Apt', '#4', 'st', 'E.', 'N-S', 'Ave.', 'Pl,', 'Ft.'
+]
+
+
+def baseline_expand(address):
+    for pattern, full in BASELINE_PATTERNS + BASELINE_SPECIAL_CASES:
+        address = re.sub(pattern, full, address)
+    return address
+
+
+def fuzzed_addresses(count=2000, seed=7):
+    rng = random.Random(seed)
+    return [
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 7)))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize('abbr', sorted(ADDRESS_ABBREVIATIONS))
+def test_each_abbreviation_matches_baseline(abbr):
+    address = f"12 {abbr} Main {abbr}, {abbr}"
+    assert expand_abbreviations(address) == baseline_expand(address)
+
+
+def test_fuzzed_addresses_match_baseline():
+    for address in fuzzed_addresses():
+        assert expand_abbreviations(address) == baseline_expand(address), address
+
+
+def test_series_form_matches_scalar_form():
+    addresses = pd.Series(fuzzed_addresses(500) + [None])
+    expected = addresses.map(expand_abbreviations, na_action='ignore')
+    pd.testing.assert_series_equal(expand_abbreviations_series(addresses), expected)
+
+
+def test_fort_greene_special_cases_are_covered():
+    for address in ['1 Ft Greene Pl', '1 Fort Greene Pl', '1 Ft. Greene Pl']:
+        assert expand_abbreviations(address) == baseline_expand(address)
+
+
+def test_unexpanded_check_flags_only_abbreviations():
+    mask = find_unexpanded_abbreviations(pd.Series(['12 Main St', '12 Main Street', None]))
+    assert mask.tolist() == [True, False, False]
@@ -0,0 +1,190 @@
+# tests/test_address_cache.py
+import os
+import json
+import pytest
+from utils import address_cache
+from utils.address_cache import CachePolicy, JsonlAddressCache, SqliteAddressCache
+
+BACKENDS = [JsonlAddressCache, SqliteAddressCache]
+
+
+class FakeClock:
+    """Stands in for the time module so expiry and recency are deterministic."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(address_cache, 'time', clock)
+    return clock
+
+
+def open_cache(backend, tmp_path, **policy):
+    cache = backend(cache_dir=str(tmp_path), policy=CachePolicy(**{
+        'ttl_seconds': 100,
+        'negative_ttl_seconds': 10,
+        'max_entries': 0,
+        'eviction': 'lru',
+        **policy
+    }))
+    if backend is SqliteAddressCache:
+        cache.evict_interval = 0
+    return cache
+
+
+def entry(address, components=True):
+    return {'full_address': address, 'components': {'Address': address} if components else None}
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_entries_survive_reopening(backend, tmp_path, clock):
+    cache = open_cache(backend, tmp_path)
+    cache.put('a', entry('1 Main St'))
+    cache.flush()
+
+    reopened = open_cache(backend, tmp_path)
+    assert reopened.get('a') == entry('1 Main St')
+    assert reopened.get_many(['a', 'missing']) == {'a': entry('1 Main St')}
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_entries_expire_after_ttl(backend, tmp_path, clock):
+    cache = open_cache(backend, tmp_path)
+    cache.put('a', entry('1 Main St'))
+    cache.flush()
+
+    clock.now += 99
+    assert cache.get('a') is not None
+    clock.now += 2
+    assert cache.get('a') is None
+    assert open_cache(backend, tmp_path).get('a') is None
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_failures_and_provisional_results_use_negative_ttl(backend, tmp_path, clock):
+    cache = open_cache(backend, tmp_path)
+    cache.put('failed', entry('bad address', components=False))
+    cache.put('provisional', {**entry('2 Main St'), 'provisional': True})
+    cache.put('verified', entry('3 Main St'))
+    cache.flush()
+
+    assert cache.get('failed') == entry('bad address', components=False)
+    clock.now += 11
+    assert cache.get('failed') is None
+    assert cache.get('provisional') is None
+    assert cache.get('verified') is not None
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_lru_evicts_least_recently_used(backend, tmp_path, clock):
+    cache = open_cache(backend, tmp_path, max_entries=3, eviction='lru')
+    for key in ('k0', 'k1', 'k2'):
+        clock.now += 1
+        cache.put(key, entry(key))
+        cache.flush()
+
+    clock.now += 1
+    cache.get('k0')
+    clock.now += 1
+    cache.put('k3', entry('k3'))
+    cache.flush()
+
+    assert sorted(cache.get_many(['k0', 'k1', 'k2', 'k3'])) == ['k0', 'k2', 'k3']
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_lfu_evicts_least_frequently_used(backend, tmp_path, clock):
+    cache = open_cache(backend, tmp_path, max_entries=3, eviction='lfu')
+    for key in ('k0', 'k1', 'k2'):
+        clock.now += 1
+        cache.put(key, entry(key))
+        cache.flush()
+
+    # k1 is the most recently read, but the new k3 has no hits yet
+    for key in ('k0', 'k0', 'k2', 'k2', 'k1'):
+        clock.now += 1
+        cache.get(key)
+    cache.flush()
+    clock.now += 1
+    cache.put('k3', entry('k3'))
+    cache.flush()
+
+    assert sorted(cache.get_many(['k0', 'k1', 'k2', 'k3'])) == ['k0', 'k1', 'k2']
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_lfu_breaks_ties_by_recency(backend, tmp_path, clock):
+    cache = open_cache(backend, tmp_path, max_entries=3, eviction='lfu')
+    for key in ('k0', 'k1', 'k2'):
+        clock.now += 1
+        cache.put(key, entry(key))
+        cache.flush()
+
+    for key in ('k0', 'k2'):
+        clock.now += 1
+        cache.get(key)
+    cache.flush()
+    clock.now += 1
+    cache.put('k3', entry('k3'))
+    cache.flush()
+
+    assert sorted(cache.get_many(['k0', 'k1', 'k2', 'k3'])) == ['k0', 'k2', 'k3']
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_rekey_moves_entries_once(backend, tmp_path, clock):
+    cache = open_cache(backend, tmp_path)
+    cache.put('old-1', entry('1 Main St'))
+    cache.put('old-2', entry('2 Main St'))
+    cache.flush()
+
+    def key_func(address):
+        return f"new:{address.lower()}"
+
+    assert cache.rekey(key_func, 1) == 2
+    assert cache.get('old-1') is None
+    assert cache.get('new:1 main st') == entry('1 Main St')
+
+    reopened = open_cache(backend, tmp_path)
+    assert reopened.get('new:2 main st') == entry('2 Main St')
+    assert reopened.rekey(key_func, 1) == 0
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_rekey_keeps_expiry(backend, tmp_path, clock):
+    cache = open_cache(backend, tmp_path)
+    cache.put('old', entry('1 Main St', components=False))
+    cache.flush()
+
+    cache.rekey(lambda address: 'new', 1)
+    assert cache.get('new') is not None
+    clock.now += 11
+    assert cache.get('new') is None
+
+
+def test_sqlite_migrates_legacy_json_without_creating_a_log(tmp_path, clock):
+    legacy = {'a': entry('1 Main St'), 'b': entry('bad address', components=False)}
+    (tmp_path / 'address_cache.json').write_text(json.dumps(legacy))
+
+    cache = open_cache(SqliteAddressCache, tmp_path)
+
+    assert cache.get_many(['a', 'b']) == legacy
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('address_cache.jsonl')]
+
+
+def test_sqlite_migrates_jsonl_log(tmp_path, clock):
+    log = open_cache(JsonlAddressCache, tmp_path)
+    log.put('a', entry('1 Main St'))
+    log.put('b', entry('2 Main St'))
+    log.put('a', entry('1 Main Street'))
+    log.flush()
+
+    cache = open_cache(SqliteAddressCache, tmp_path)
+
+    assert cache.get_many(['a', 'b']) == {'a': entry('1 Main Street'), 'b': entry('2 Main St')}
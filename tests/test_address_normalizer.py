@@ -0,0 +1,82 @@
+# tests/test_address_normalizer.py
+import pandas as pd
+import pytest
+from utils.address_normalizer import (
+    DEFAULT_CLEAN_CACHE_SIZE, canonical_address, canonical_address_key, clean_address,
+    clean_address_series, configure_clean_cache
+)
+
+CLEAN_SAMPLES = [
+    '123 West 23rd Street, New York, ny 10011',
+    "  12 O'Brien Ave  #3B!!, Bronx,nY 10451-1234 ",
+    '123 1/2 Main St; Albany, NY 12207',
+    'Café Row @ 5 Ávila Ct, Miami, fl 33101',
+    'snake_case_street*, Nowhere',
+    '\t10   Main\nSt ,  Albany, ny 12207',
+    '',
+]
+
+
+@pytest.mark.parametrize('variants', [
+    [
+        '123 West 23rd Street, New York, NY 10011',
+        '123 W 23 St, New York, NY 10011',
+        '123 w. 23rd st., new york, new york 10011-1234',
+        '  123  West 23RD Street ,New York,  NY   10011 ',
+    ],
+    [
+        '45 Fort Greene Pl Apt 3B, Brooklyn, NY 11217',
+        '45 Ft Greene Place #3B, Brooklyn, New York 11217',
+        '45 Fort Greene Pl, Apartment 3B, Brooklyn, NY 11217',
+    ],
+    [
+        "12 O'Brien Ave, Bronx, NY 10451",
+        '12 OBrien Avenue, Bronx, NY 10451',
+    ],
+])
+def test_spelling_variants_share_a_key(variants):
+    keys = {canonical_address_key(address) for address in variants}
+    assert len(keys) == 1, [canonical_address(address) for address in variants]
+
+
+@pytest.mark.parametrize('first, second', [
+    ('123 1/2 Main St, Albany, NY 12207', '123 12 Main St, Albany, NY 12207'),
+    ('10 Main St Apt 2, Albany, NY 12207', '10 Main St Apt 3, Albany, NY 12207'),
+    ('10 Main St, Albany, NY 12207', '10 Main St, Albany, NY 12208'),
+    ('10 Main St, Portland, ME 04101', '10 Main St, Portland, OR 04101'),
+])
+def test_different_addresses_get_different_keys(first, second):
+    assert canonical_address_key(first) != canonical_address_key(second)
+
+
+def test_key_does_not_depend_on_prior_cleaning():
+    raw = "12 O'Brien Pl #3 @, Bronx, ny 10451"
+    assert canonical_address_key(raw) == canonical_address_key("12 O'Brien Pl #3, Bronx, NY 10451")
+
+
+@pytest.mark.parametrize('address', [None, '', 12345])
+def test_missing_addresses_have_no_key(address):
+    assert canonical_address_key(address) is None
+
+
+def test_clean_address_series_matches_clean_address():
+    series = pd.Series(CLEAN_SAMPLES + [None, 12207])
+    cleaned = clean_address_series(series)
+    expected = [clean_address(address) for address in CLEAN_SAMPLES] + [None, '12207']
+    assert cleaned.tolist() == expected
+
+
+@pytest.mark.parametrize('address', CLEAN_SAMPLES)
+def test_clean_address_is_idempotent(address):
+    cleaned = clean_address(address)
+    assert clean_address(cleaned) == cleaned
+    assert clean_address_series(pd.Series([cleaned])).tolist() == [cleaned]
+
+
+def test_clean_address_cache_size_does_not_change_results():
+    expected = [clean_address(address) for address in CLEAN_SAMPLES]
+    try:
+        configure_clean_cache(0)
+        assert [clean_address(address) for address in CLEAN_SAMPLES] == expected
+    finally:
+        configure_clean_cache(DEFAULT_CLEAN_CACHE_SIZE)
@@ -0,0 +1,103 @@
+# tests/test_address_standardizer.py
+import asyncio
+import contextlib
+import pytest
+from utils import address_cache
+from utils.address_standardizer import AddressStandardizer
+from utils.geocoders import MockBackend
+
+
+class FakeClock:
+    """Stands in for the cache's time module so expiry can be checked."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(address_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def standardizer(tmp_path, monkeypatch, clock):
+    """Standardizer whose geocoder answers but never finds anything."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('ADDRESS_RESOLUTION_MODE', 'tiered')
+    monkeypatch.setenv('ZIP_REFERENCE_DB', str(tmp_path / 'zip_reference.sqlite'))
+    return AddressStandardizer(geocoder=MockBackend(latency=0, failure_rate=1))
+
+
+@pytest.mark.parametrize('standardize', [
+    lambda standardizer, address: standardizer.standardize(address),
+    lambda standardizer, address: standardizer.standardize_batch([address])[address],
+])
+def test_fallback_parses_expire_on_negative_ttl(standardizer, clock, standardize):
+    address = '10 Main St, Springfield, ZZ 12345'
+    result = standardize(standardizer, address)
+    assert result['tier'] == 'fallback'
+
+    key = standardizer._get_cache_key(address)
+    clock.now += 23 * 3600
+    assert standardizer._address_cache.get(key) is not None
+    clock.now += 2 * 3600
+    assert standardizer._address_cache.get(key) is None
+
+
+def test_standardize_serves_repeat_lookups_from_cache(standardizer):
+    address = '10 Main St, Springfield, ZZ 12345'
+    first = standardizer.standardize(address)
+
+    cached = standardizer.standardize(' 10  Main St, Springfield, zz 12345')
+
+    assert cached['full_address'] == address
+    assert cached['components'] == first['components']
+
+
+class SessionBackend(MockBackend):
+    """Mock backend whose lookups fail if their batch's session was closed."""
+
+    def __init__(self):
+        super().__init__(latency=0.01)
+        self.opened = 0
+
+    @contextlib.asynccontextmanager
+    async def async_session(self):
+        self.opened += 1
+        session = {'open': True}
+
+        async def ageocode(address):
+            await asyncio.sleep(self._delay())
+            assert session['open'], "lookup on a closed session"
+            return self._respond(address)
+
+        try:
+            yield ageocode
+        finally:
+            session['open'] = False
+
+
+def test_concurrent_async_batches_keep_their_own_sessions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('ADDRESS_RESOLUTION_MODE', 'verify')
+    monkeypatch.setenv('ZIP_REFERENCE_DB', str(tmp_path / 'zip_reference.sqlite'))
+    backend = SessionBackend()
+    standardizer = AddressStandardizer(geocoder=backend)
+    short = ['1 Main St, Albany, NY 12207']
+    long = [f'{n} Main St, Albany, NY 12207' for n in range(2, 40)]
+
+    async def run_both():
+        return await asyncio.gather(
+            standardizer.astandardize_batch(short),
+            standardizer.astandardize_batch(long, max_concurrency=2),
+        )
+
+    first, second = asyncio.run(run_both())
+
+    assert backend.opened == 2
+    assert all(result['tier'] == 'network' for result in {**first, **second}.values())
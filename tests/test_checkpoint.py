@@ -0,0 +1,31 @@
+# tests/test_checkpoint.py
+import os
+import numpy as np
+import pandas as pd
+from utils.checkpoint import RunCheckpoint
+
+
+def test_opening_a_checkpoint_creates_nothing(tmp_path):
+    checkpoint = RunCheckpoint('run', str(tmp_path), settings={'mode': 'tiered'})
+
+    assert not checkpoint.has('filtered')
+    assert checkpoint.load_addresses() == {}
+    assert os.listdir(tmp_path) == []
+
+
+def test_frames_load_with_their_original_dtypes(tmp_path):
+    df = pd.DataFrame({
+        'Address': ['1 Main Street', '2 Elm Avenue', None],
+        'Property class': ['C0', 'B1', 'C0'],
+        'Zipcode': ['10019', '11217', '10003'],
+        'Units': [1, 'n/a', 3],
+        'Price': [1.5, np.nan, 3.0],
+    })
+    checkpoint = RunCheckpoint('run', str(tmp_path))
+    checkpoint.save_frame('filtered', df, {'total_records': 3})
+
+    loaded, stats = RunCheckpoint('run', str(tmp_path)).load_frame('filtered')
+
+    assert stats == {'total_records': 3}
+    assert loaded.dtypes.to_dict() == df.dtypes.to_dict()
+    pd.testing.assert_frame_equal(loaded.drop(columns='Units'), df.drop(columns='Units'))
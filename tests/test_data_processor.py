@@ -0,0 +1,118 @@
+# tests/test_data_processor.py
+import os
+import re
+import zipfile
+import numpy as np
+import pandas as pd
+import pytest
+from utils.data_processor import DataProcessor
+
+
+def baseline_full_address(row):
+    """Row-wise full address as built before create_full_addresses was vectorized."""
+    components = []
+    if row.get('Address'):
+        components.append(row['Address'])
+    if row.get('City'):
+        components.append(row['City'])
+    if row.get('State'):
+        state_zip = row['State']
+        if row.get('Zipcode'):
+            state_zip += f" {row['Zipcode']}"
+        components.append(state_zip)
+    return ', '.join(filter(None, components))
+
+
+@pytest.fixture(scope="module")
+def processor(tmp_path_factory):
+    """DataProcessor on the mock geocoder, with caches and indexes in a temp dir."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(tmp_path_factory.mktemp("processor"))
+        mp.setenv('GEOCODER_BACKEND', 'mock')
+        yield DataProcessor(['A1'])
+
+
+def test_create_full_addresses_matches_row_wise_baseline(processor):
+    df = pd.DataFrame({
+        'Address': ['12 Main St', '', None, ' 5 Elm Ave ', '7 Oak Rd', np.nan, '9 Pine Ln'],
+        'City': ['Brooklyn', 'Queens', 'Bronx', '', 'Albany', 'Troy', None],
+        'State': ['NY', 'NY', '', 'NJ', None, 'NY', 'NY'],
+        'Zipcode': ['11201', '', '10451', '07030', '12207', 12180, '  '],
+    })
+    expected = df.copy()
+    for col in processor.address_components:
+        expected[col] = expected[col].fillna('').astype(str).str.strip()
+    expected = expected.apply(baseline_full_address, axis=1)
+
+    result = processor.create_full_addresses(df.copy())
+
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+
+def test_create_full_addresses_handles_missing_columns(processor):
+    df = pd.DataFrame({'Address': ['12 Main St', ''], 'State': ['NY', 'NY']})
+    expected = df.apply(baseline_full_address, axis=1)
+
+    result = processor.create_full_addresses(df.copy())
+
+    assert result.tolist() == expected.tolist() == ['12 Main St, NY', 'NY']
+
+
+def write_workbook(path, header, rows, dimension=None):
+    """Write an xlsx, optionally overwriting the <dimension> tag as some writers get it wrong."""
+    pd.DataFrame(rows, columns=range(len(header))).set_axis(header, axis=1).to_excel(path, index=False)
+    if dimension is None:
+        return
+    with zipfile.ZipFile(path) as src:
+        parts = {name: src.read(name) for name in src.namelist()}
+    sheet = 'xl/worksheets/sheet1.xml'
+    parts[sheet] = re.sub(rb'<dimension ref="[^"]*"', f'<dimension ref="{dimension}"'.encode(), parts[sheet])
+    with zipfile.ZipFile(path, 'w') as dst:
+        for name, data in parts.items():
+            dst.writestr(name, data)
+
+
+def test_iter_data_chunks_ignores_wrong_dimension(processor, tmp_path):
+    path = tmp_path / 'wrong_dimension.xlsx'
+    rows = [[f'{i} Main St', 'A1', i] for i in range(50)]
+    write_workbook(path, ['Address', 'Property class', 'Units'], rows, dimension='A1:B10')
+
+    chunks = list(processor.iter_data_chunks(path, chunk_size=20))
+
+    assert [len(chunk) for chunk in chunks] == [20, 20, 10]
+    assert pd.concat(chunks).shape == pd.read_excel(path).shape == (50, 3)
+
+
+def test_iter_data_chunks_dedups_headers_like_pandas(processor, tmp_path):
+    path = tmp_path / 'duplicate_headers.xlsx'
+    header = ['Address', 'Address', 'City', 'Address', None]
+    write_workbook(path, header, [['1 Main St', '2 Main St', 'Troy', '3 Main St', 'x']])
+
+    chunk = next(processor.iter_data_chunks(path))
+
+    assert list(chunk.columns) == list(pd.read_excel(path).columns)
+    assert chunk['Address'].tolist() == ['1 Main St']
+
+
+def test_component_frame_handles_all_empty_street_components(processor):
+    results = {
+        ', New York, NY 10019': {
+            'full_address': ', New York, NY 10019',
+            'components': {'Address': '', 'City': 'New York', 'State': 'NY', 'Zipcode': '10019'},
+        },
+    }
+
+    components_df = processor._build_component_frame(results)
+
+    assert components_df['Address'].isna().all()
+    assert components_df.loc[', New York, NY 10019', 'Zipcode'] == '10019'
+
+
+def test_runs_without_valid_rows_leave_no_checkpoint(processor, tmp_path, monkeypatch):
+    monkeypatch.setattr(processor, 'checkpoint_dir', str(tmp_path))
+    df = pd.DataFrame({'Address': ['1 Main St'], 'Property class': ['ZZ']})
+
+    processed_df, run_stats = processor.process_dataframe(df, run_id='upload-1')
+
+    assert processed_df is None and run_stats['filtered_count'] == 0
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,53 @@
+# tests/test_geocoders.py
+import pandas as pd
+import pytest
+from utils.geocoders import GeocoderBackend, LocalReferenceBackend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    path = tmp_path / 'reference.csv'
+    pd.DataFrame({
+        'Address': ['123 W 57th St', '45 Fort Greene Pl', '9 E 1st Ave'],
+        'City': ['New York', 'Brooklyn', 'New York'],
+        'State': ['NY', 'NY', 'NY'],
+        'Zipcode': ['10019', '11217', '10003'],
+    }).to_csv(path, index=False)
+    return LocalReferenceBackend(path=str(path))
+
+
+@pytest.mark.parametrize('address', [
+    '123 W 57th St, New York, NY 10019',
+    '123 w 57th st, New York, NY 10019',
+    '123 West 57 Street, new york, New York 10019-1234',
+    '45 ft greene place, Brooklyn, NY 11217',
+    '9 east 1st avenue, Manhattan, NY 10003',
+])
+def test_lookup_ignores_spelling_variants(backend, address):
+    assert backend.geocode_one(address)['Zipcode'] in ('10019', '11217', '10003')
+
+
+def test_geocode_many_matches_geocode_one(backend):
+    addresses = [
+        '123 w 57th st, New York, NY 10019',
+        '9 east 1st avenue, Manhattan, NY 10003',
+        '123 w 57th st, New York, NY 10019',
+        '1 Nowhere Rd, Albany, NY 12207',
+        '',
+        None,
+    ]
+
+    results = backend.geocode_many(addresses)
+
+    assert results == {address: backend.geocode_one(address) for address in addresses}
+    assert results['1 Nowhere Rd, Albany, NY 12207'] is None
+
+
+def test_default_geocode_many_loops_over_geocode_one():
+    class EchoBackend(GeocoderBackend):
+        name = 'echo'
+
+        def geocode_one(self, address):
+            return {'Address': address} if address else None
+
+    assert EchoBackend().geocode_many(['1 Main St', '']) == {'1 Main St': {'Address': '1 Main St'}, '': None}
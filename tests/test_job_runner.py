@@ -0,0 +1,48 @@
+# tests/test_job_runner.py
+from utils.job_runner import JobRunner
+
+
+class FakeProcessor:
+    """Returns canned process_file_with_stats results in order."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def process_file_with_stats(self, file_path, status_callback=None, progress_callback=None,
+                                run_id=None):
+        self.calls += 1
+        return self.results.pop(0)
+
+
+def run(runner, key, on_complete=None):
+    job_id = runner.submit(b'workbook', 'upload.xlsx', key=key, on_complete=on_complete)
+    return runner.wait(job_id, 5)
+
+
+def test_pipeline_error_fails_the_job():
+    stats = {'initial_count': 3, 'filtered_count': 3, 'final_count': 0, 'error': 'geocoder down'}
+    runner = JobRunner(FakeProcessor((None, stats)))
+
+    job = run(runner, 'upload-1')
+
+    assert job['status'] == 'failed'
+    assert job['error'] == 'geocoder down'
+
+
+def test_failed_and_empty_jobs_are_not_reused():
+    ok = {'initial_count': 3, 'filtered_count': 3, 'final_count': 3}
+    failed = {**ok, 'error': 'geocoder down'}
+    processor = FakeProcessor((None, failed), (None, ok), ('frame', ok), ('frame', ok))
+    runner = JobRunner(processor)
+    save = lambda job, df, stats: 'saved.parquet' if df is not None else None
+
+    first = run(runner, 'upload-1', save)
+    second = run(runner, 'upload-1', save)
+    third = run(runner, 'upload-1', save)
+    fourth = run(runner, 'upload-1', save)
+
+    assert [first['status'], second['status'], third['status']] == ['failed', 'completed', 'completed']
+    assert second['result'] is None and third['result'] == 'saved.parquet'
+    assert fourth['id'] == third['id']
+    assert processor.calls == 3
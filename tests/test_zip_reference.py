@@ -0,0 +1,32 @@
+# tests/test_zip_reference.py
+import pytest
+from utils.zip_reference import ZipReference
+
+
+@pytest.fixture(scope="module")
+def zip_reference(tmp_path_factory):
+    return ZipReference(db_path=str(tmp_path_factory.mktemp("zip") / "zip_reference.sqlite"))
+
+
+@pytest.mark.parametrize('zipcode, borough', [
+    ('10019', 'Manhattan'),
+    ('11101', 'Queens'),
+    ('11375', 'Queens'),
+    ('11432', 'Queens'),
+    ('11694', 'Queens'),
+    ('11550', None),
+    ('11501', None),
+    ('11580', None),
+    ('11561', None),
+])
+def test_borough_for_zip(zip_reference, zipcode, borough):
+    assert zip_reference.borough_for_zip(zipcode) == borough
+
+
+@pytest.mark.parametrize('city, zipcode', [
+    ('Hempstead', '11550'),
+    ('Jamaica', '11432'),
+])
+def test_long_island_addresses_score_fully(zip_reference, city, zipcode):
+    components = {'Address': '50 Main St', 'City': city, 'State': 'NY', 'Zipcode': zipcode}
+    assert zip_reference.confidence(components) == pytest.approx(1.0)
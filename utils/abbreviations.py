@@ -0,0 +1,88 @@
+# utils/abbreviations.py
+import re
+
+# Street suffix abbreviations
+STREET_ABBREVIATIONS = {
+    'St': 'Street',
+    'Ave': 'Avenue',
+    'Rd': 'Road',
+    'Blvd': 'Boulevard',
+    'Ln': 'Lane',
+    'Dr': 'Drive',
+    'Ct': 'Court',
+    'Pl': 'Place',
+    'Ter': 'Terrace',
+    'Cir': 'Circle',
+    'Hwy': 'Highway',
+    'Pkwy': 'Parkway',
+    'Sq': 'Square',
+    'Ft': 'Fort'
+}
+
+# Directional abbreviations
+DIRECTION_ABBREVIATIONS = {
+    'N': 'North',
+    'S': 'South',
+    'E': 'East',
+    'W': 'West',
+    'NE': 'Northeast',
+    'NW': 'Northwest',
+    'SE': 'Southeast',
+    'SW': 'Southwest'
+}
+
+ADDRESS_ABBREVIATIONS = {**STREET_ABBREVIATIONS, **DIRECTION_ABBREVIATIONS}
+
+
+class AbbreviationExpander:
+    """Expand whole-word abbreviations in a single regex pass."""
+
+    def __init__(self, abbreviations):
+        self.abbreviations = dict(abbreviations)
+        alternatives = sorted(self.abbreviations, key=len, reverse=True)
+        self.pattern = re.compile(
+            r'\b(?:' + '|'.join(re.escape(abbr) for abbr in alternatives) + r')\b'
+        )
+
+    def _replace(self, match):
+        return self.abbreviations[match.group(0)]
+
+    def expand(self, text):
+        """Expand every abbreviation in a single string."""
+        if not text:
+            return text
+        return self.pattern.sub(self._replace, text)
+
+    def expand_series(self, series):
+        """Expand every abbreviation across a pandas string Series."""
+        return series.str.replace(self.pattern, self._replace, regex=True)
+
+
+address_expander = AbbreviationExpander(ADDRESS_ABBREVIATIONS)
+
+
+def expand_abbreviations(text):
+    """Expand street and directional abbreviations in an address."""
+    return address_expander.expand(text)
+
+
+def expand_abbreviations_series(series):
+    """Vectorized expand_abbreviations for a whole address column."""
+    return address_expander.expand_series(series)
+
+
+# Abbreviations that should never survive standardization
+UNEXPANDED_ABBREVIATIONS = ['St', 'Ave', 'Rd', 'Blvd', 'Ln', 'Dr', 'Ct', 'Pl', 'Ft']
+UNEXPANDED_PATTERN = re.compile(
+    r' (?:' + '|'.join(UNEXPANDED_ABBREVIATIONS) + r')\b'
+)
+
+
+def find_unexpanded_abbreviations(series):
+    """Boolean mask of addresses that still contain a common abbreviation."""
+    return series.str.contains(UNEXPANDED_PATTERN, na=False)
+
+
+def count_unexpanded_abbreviations(series):
+    """Count occurrences of each unexpanded abbreviation in a Series."""
+    return series.str.findall(UNEXPANDED_PATTERN).explode().dropna().str.strip().value_counts()
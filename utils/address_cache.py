@@ -0,0 +1,691 @@
+# utils/address_cache.py
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks
+    fcntl = None
+
+
+class CachePolicy:
+    """Expiry, size limit and eviction settings shared by the cache backends."""
+
+    eviction_policies = ('lru', 'lfu')
+
+    def __init__(self, ttl_seconds=None, negative_ttl_seconds=None, max_entries=None,
+                 eviction=None):
+        # Zero disables a limit; failed lookups expire much sooner than results
+        self.ttl_seconds = self._setting(ttl_seconds, 'ADDRESS_CACHE_TTL_DAYS', 180, 86400)
+        self.negative_ttl_seconds = self._setting(
+            negative_ttl_seconds, 'ADDRESS_CACHE_NEGATIVE_TTL_HOURS', 24, 3600
+        )
+        self.max_entries = int(self._setting(max_entries, 'ADDRESS_CACHE_MAX_ENTRIES', 500000, 1))
+        self.eviction = (eviction or os.getenv('ADDRESS_CACHE_EVICTION') or 'lru').lower()
+        if self.eviction not in self.eviction_policies:
+            raise ValueError(f"Unknown address cache eviction policy: {self.eviction}")
+
+    @staticmethod
+    def _setting(value, env_name, default, unit_seconds):
+        """Explicit value (already in base units) or the env setting scaled to them."""
+        if value is not None:
+            return value
+        return float(os.getenv(env_name, default)) * unit_seconds
+
+    def expires_at(self, entry, now):
+        """Expiry timestamp for an entry written now, or None if it never expires.
+
+        Failed lookups and provisional (unverified) results use the negative TTL.
+        """
+        verified = entry.get('components') and not entry.get('provisional')
+        ttl = self.ttl_seconds if verified else self.negative_ttl_seconds
+        return now + ttl if ttl else None
+
+
+class JsonlAddressCache:
+    """Append-only JSONL address cache with periodic compaction.
+
+    Processes sharing the file serialize writes with an advisory lock and
+    replay each other's appends, so entries are never lost to a last writer.
+    """
+
+    def __init__(self, cache_dir="data/cache", filename="address_cache.jsonl",
+                 flush_every=500, compact_ratio=2.0, min_compact_lines=1000, policy=None):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, filename)
+        self.lock_path = f"{self.path}.lock"
+        self.legacy_path = os.path.join(cache_dir, "address_cache.json")
+        self.policy = policy or CachePolicy()
+
+        # Flush and compaction settings
+        self.flush_every = flush_every
+        self.compact_ratio = compact_ratio
+        self.min_compact_lines = min_compact_lines
+
+        self._entries = {}
+        self._expires = {}
+        self._access = {}
+        self._pending = {}
+        self._log_lines = 0
+        self._lock = threading.Lock()
+
+        # Identity and read position of the log, to pick up other processes' writes
+        self._inode = None
+        self._offset = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.load()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __len__(self):
+        return len(self._entries)
+
+    @contextmanager
+    def _file_lock(self, exclusive=True):
+        """Advisory lock on a sidecar file, shared across processes."""
+        if fcntl is None:
+            # No advisory locks on this platform: fall back to single-process use
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _live(self, key, now):
+        """Whether key holds an unexpired entry."""
+        if key not in self._entries:
+            return False
+        expires_at = self._expires.get(key)
+        return expires_at is None or expires_at > now
+
+    def _touch(self, key, now):
+        """Record an access for LRU/LFU eviction."""
+        _, hits = self._access.get(key, (now, 0))
+        self._access[key] = (now, hits + 1)
+
+    def get(self, key, default=None):
+        """Return the cached entry for key, or default."""
+        now = time.time()
+        if not self._live(key, now):
+            # Another process may have resolved it since we last read the log
+            self.refresh()
+            if not self._live(key, now):
+                return default
+        self._touch(key, now)
+        return self._entries[key]
+
+    def get_many(self, keys):
+        """Return a dict of the cached entries among keys."""
+        self.refresh()
+        now = time.time()
+        found = {}
+        for key in keys:
+            if self._live(key, now):
+                self._touch(key, now)
+                found[key] = self._entries[key]
+        return found
+
+    def _record(self, key, entry):
+        """Serialized log line for an entry."""
+        return json.dumps({'key': key, **entry, 'expires_at': self._expires.get(key)}) + '\n'
+
+    def _replay(self, f, now):
+        """Apply log lines from the current position of f; caller holds the lock."""
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Skip a torn final line from an interrupted append
+                continue
+            self._log_lines += 1
+            key = record['key']
+            expires_at = record.get('expires_at')
+            if expires_at is not None and expires_at <= now:
+                self._entries.pop(key, None)
+                self._expires.pop(key, None)
+                continue
+            self._entries[key] = {
+                'full_address': record.get('full_address'),
+                'components': record.get('components')
+            }
+            self._expires[key] = expires_at
+            self._access.setdefault(key, (now, 0))
+        self._offset = f.tell()
+
+    def _refresh_locked(self):
+        """Read lines appended by other processes, or reload after their compaction."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino == self._inode and stat.st_size == self._offset:
+            return
+
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # The log was rewritten: rebuild from scratch, keeping our unflushed entries
+            self._entries = {}
+            self._expires = {}
+            self._log_lines = 0
+            self._offset = 0
+        with open(self.path, 'r') as f:
+            self._inode = os.fstat(f.fileno()).st_ino
+            f.seek(self._offset)
+            self._replay(f, time.time())
+        for key, entry in self._pending.items():
+            self._entries[key] = entry
+            self._expires[key] = self.policy.expires_at(entry, time.time())
+
+    def _unchanged(self):
+        """Cheap check that the log is still the file and length we last read."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return stat.st_ino == self._inode and stat.st_size == self._offset
+
+    def refresh(self):
+        """Pick up entries other processes have flushed since the last read."""
+        # One stat per call; the lock and the file are only touched when the log moved
+        if self._unchanged():
+            return
+        try:
+            with self._lock, self._file_lock(exclusive=False):
+                self._refresh_locked()
+        except Exception as e:
+            self.logger.error(f"Error refreshing cache: {str(e)}")
+
+    def load(self):
+        """Replay the JSONL log, migrating the legacy JSON cache if needed."""
+        try:
+            with self._lock, self._file_lock():
+                if not os.path.exists(self.path) and os.path.exists(self.legacy_path):
+                    self._migrate_legacy()
+                    return
+                self._refresh_locked()
+        except Exception as e:
+            self.logger.error(f"Error loading cache: {str(e)}")
+            self._entries = {}
+            self._expires = {}
+            self._access = {}
+            self._log_lines = 0
+            self._inode = None
+            self._offset = 0
+
+    def _migrate_legacy(self):
+        """Import address_cache.json into a fresh compacted log; caller holds the locks."""
+        with open(self.legacy_path, 'r') as f:
+            self._entries = json.load(f)
+        now = time.time()
+        self._expires = {key: self.policy.expires_at(entry, now) for key, entry in self._entries.items()}
+        self._access = {key: (now, 0) for key in self._entries}
+        self._compact_locked()
+        self.logger.info(f"Migrated {len(self._entries)} entries from {self.legacy_path}")
+
+    def put(self, key, entry):
+        """Store an entry in memory and queue it for the next flush."""
+        now = time.time()
+        with self._lock:
+            self._entries[key] = entry
+            self._expires[key] = self.policy.expires_at(entry, now)
+            self._access[key] = (now, 0)
+            self._pending[key] = entry
+            should_flush = len(self._pending) >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Append queued entries to the log and compact when it grows stale."""
+        with self._lock:
+            if not self._pending:
+                return
+            try:
+                with self._file_lock():
+                    # Catch up first so compaction keeps other processes' entries
+                    self._refresh_locked()
+                    pending, self._pending = self._pending, {}
+                    with open(self.path, 'a') as f:
+                        for key, entry in pending.items():
+                            f.write(self._record(key, entry))
+                        self._offset = f.tell()
+                    self._inode = os.stat(self.path).st_ino
+                    self._log_lines += len(pending)
+
+                    evicted = self._evict()
+                    if evicted or (
+                        self._log_lines >= self.min_compact_lines and
+                        self._log_lines > self.compact_ratio * len(self._entries)
+                    ):
+                        self._compact_locked()
+            except Exception as e:
+                self.logger.error(f"Error saving cache: {str(e)}")
+
+    def _evict(self):
+        """Drop expired entries, then the least recently/frequently used over the cap.
+
+        Caller must hold the lock; returns the number of entries removed.
+        """
+        now = time.time()
+        expired = [
+            key for key, expires_at in self._expires.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        victims = set(expired)
+
+        excess = len(self._entries) - len(victims) - self.policy.max_entries
+        if self.policy.max_entries and excess > 0:
+            if self.policy.eviction == 'lfu':
+                rank = lambda key: (self._access.get(key, (0, 0))[1], self._access.get(key, (0, 0))[0])
+            else:
+                rank = lambda key: self._access.get(key, (0, 0))[0]
+            candidates = sorted((key for key in self._entries if key not in victims), key=rank)
+            victims.update(candidates[:excess])
+
+        for key in victims:
+            self._entries.pop(key, None)
+            self._expires.pop(key, None)
+            self._access.pop(key, None)
+        if victims:
+            self.logger.info(f"Evicted {len(victims)} address cache entries")
+        return len(victims)
+
+    def rekey(self, key_func, version):
+        """Re-key entries from their full_address when the key scheme changes."""
+        version_path = f"{self.path}.version"
+        self.flush()
+        with self._lock, self._file_lock():
+            current = 0
+            if os.path.exists(version_path):
+                with open(version_path, 'r') as f:
+                    current = int(f.read().strip() or 0)
+            if current >= version:
+                return 0
+
+            self._refresh_locked()
+            rekeyed = {}
+            expires = {}
+            for old_key, entry in self._entries.items():
+                key = key_func(entry.get('full_address'))
+                if key and key not in rekeyed:
+                    rekeyed[key] = entry
+                    expires[key] = self._expires.get(old_key)
+            now = time.time()
+            self._entries = rekeyed
+            self._expires = expires
+            self._access = {key: (now, 0) for key in rekeyed}
+            self._compact_locked()
+            with open(version_path, 'w') as f:
+                f.write(str(version))
+        self.logger.info(f"Re-keyed {len(rekeyed)} cache entries to key version {version}")
+        return len(rekeyed)
+
+    def compact(self):
+        """Rewrite the log with exactly one line per live entry."""
+        with self._lock, self._file_lock():
+            self._refresh_locked()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        """Rewrite the log from memory; caller holds both locks and has refreshed."""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                for key, entry in self._entries.items():
+                    f.write(self._record(key, entry))
+                self._offset = f.tell()
+            os.replace(tmp_path, self.path)
+            self._inode = os.stat(self.path).st_ino
+            self._log_lines = len(self._entries)
+            self._pending = {}
+        except Exception as e:
+            self.logger.error(f"Error compacting cache: {str(e)}")
+
+
+class SqliteAddressCache:
+    """SQLite address cache with lazy, indexed lookups, shared safely across processes."""
+
+    # Stay under SQLite's default limit on bound parameters per statement
+    max_query_params = 900
+
+    # Seconds to wait on another process's write lock
+    busy_timeout = 30.0
+
+    # Minimum seconds between expiry/size sweeps triggered by flushes
+    evict_interval = 60.0
+
+    def __init__(self, cache_dir="data/cache", filename="address_cache.sqlite",
+                 flush_every=500, policy=None):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.flush_every = flush_every
+        self.policy = policy or CachePolicy()
+
+        if filename == ':memory:':
+            self.path = filename
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.path = os.path.join(cache_dir, filename)
+        is_new = self.path == ':memory:' or not os.path.exists(self.path)
+
+        self._pending = {}
+        self._touched = {}
+        self._last_evicted = 0.0
+        self._lock = threading.Lock()
+
+        # Other processes may hold the database: wait for their writes rather than fail
+        self._conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        if self.path != ':memory:':
+            # WAL lets readers in every process see committed entries while one writes
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+
+        # Schema setup is serialized so concurrent first starts don't race
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS address_cache ("
+                "cache_key TEXT PRIMARY KEY, "
+                "full_address TEXT, "
+                "components TEXT, "
+                "expires_at REAL, "
+                "accessed_at REAL, "
+                "hits INTEGER NOT NULL DEFAULT 0"
+                ") WITHOUT ROWID"
+            )
+            self._add_policy_columns()
+            
+            # Expiry sweeps and LRU/LFU trims read these orders instead of scanning
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS address_cache_expires ON address_cache (expires_at)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS address_cache_accessed ON address_cache (accessed_at)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS address_cache_hits ON address_cache (hits, accessed_at)"
+            )
+
+        if is_new and self.path != ':memory:':
+            self._migrate_legacy()
+        self._evict()
+
+    def _add_policy_columns(self):
+        """Add expiry/access columns to databases created before they existed."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(address_cache)")}
+        if 'expires_at' in columns:
+            return
+        now = time.time()
+        self._conn.execute("ALTER TABLE address_cache ADD COLUMN expires_at REAL")
+        self._conn.execute("ALTER TABLE address_cache ADD COLUMN accessed_at REAL")
+        self._conn.execute("ALTER TABLE address_cache ADD COLUMN hits INTEGER NOT NULL DEFAULT 0")
+        if self.policy.ttl_seconds:
+            self._conn.execute(
+                "UPDATE address_cache SET expires_at = ?", (now + self.policy.ttl_seconds,)
+            )
+        self._conn.execute("UPDATE address_cache SET accessed_at = ?", (now,))
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __len__(self):
+        with self._lock:
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM address_cache WHERE expires_at IS NULL OR expires_at > ?",
+                (time.time(),)
+            ).fetchone()[0]
+            return count + sum(1 for key in self._pending if not self._exists(key))
+
+    def _exists(self, key):
+        """Check for a persisted key; caller must hold the lock."""
+        row = self._conn.execute(
+            "SELECT 1 FROM address_cache WHERE cache_key = ?", (key,)
+        ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def _to_entry(full_address, components):
+        """Build a cache entry from a stored row."""
+        return {
+            'full_address': full_address,
+            'components': json.loads(components) if components else None
+        }
+
+    def _touch(self, key):
+        """Count a hit; access stats are written with the next flush. Caller holds the lock."""
+        self._touched[key] = self._touched.get(key, 0) + 1
+
+    def get(self, key, default=None):
+        """Point lookup on the primary-key index."""
+        if key is None:
+            return default
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            row = self._conn.execute(
+                "SELECT full_address, components FROM address_cache "
+                "WHERE cache_key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+            if row is not None:
+                self._touch(key)
+        if row is None:
+            return default
+        return self._to_entry(*row)
+
+    def get_many(self, keys):
+        """Bulk lookup of keys with chunked IN (...) queries."""
+        found = {}
+        remaining = []
+        now = time.time()
+        with self._lock:
+            for key in dict.fromkeys(k for k in keys if k is not None):
+                if key in self._pending:
+                    found[key] = self._pending[key]
+                else:
+                    remaining.append(key)
+
+            for i in range(0, len(remaining), self.max_query_params):
+                chunk = remaining[i:i + self.max_query_params]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT cache_key, full_address, components FROM address_cache "
+                    f"WHERE cache_key IN ({placeholders}) "
+                    "AND (expires_at IS NULL OR expires_at > ?)",
+                    chunk + [now]
+                ).fetchall()
+                for key, full_address, components in rows:
+                    found[key] = self._to_entry(full_address, components)
+                    self._touch(key)
+        return found
+
+    def put(self, key, entry):
+        """Queue an entry for the next batched flush."""
+        with self._lock:
+            self._pending[key] = entry
+            should_flush = len(self._pending) >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Write queued entries and access stats in one transaction, then enforce limits."""
+        with self._lock:
+            if not self._pending and not self._touched:
+                return
+            pending, self._pending = self._pending, {}
+            touched, self._touched = self._touched, {}
+            try:
+                self._write(pending, touched)
+            except Exception as e:
+                self.logger.error(f"Error saving cache: {str(e)}")
+                return
+        if pending and time.time() - self._last_evicted >= self.evict_interval:
+            self._evict()
+
+    def _write(self, entries, touched=None):
+        """Upsert entries and record hits; caller must hold the lock."""
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO address_cache "
+                "(cache_key, full_address, components, expires_at, accessed_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                [
+                    (
+                        key,
+                        entry.get('full_address'),
+                        json.dumps(entry.get('components')),
+                        self.policy.expires_at(entry, now),
+                        now
+                    )
+                    for key, entry in entries.items()
+                ]
+            )
+            if touched:
+                self._conn.executemany(
+                    "UPDATE address_cache SET accessed_at = ?, hits = hits + ? WHERE cache_key = ?",
+                    [(now, hits, key) for key, hits in touched.items()]
+                )
+
+    def _evict(self):
+        """Delete expired rows, then the least recently/frequently used over the cap."""
+        with self._lock:
+            self._last_evicted = time.time()
+            try:
+                with self._conn:
+                    removed = self._conn.execute(
+                        "DELETE FROM address_cache WHERE expires_at <= ?", (time.time(),)
+                    ).rowcount
+                    if self.policy.max_entries:
+                        count = self._conn.execute("SELECT COUNT(*) FROM address_cache").fetchone()[0]
+                        excess = count - self.policy.max_entries
+                        if excess > 0:
+                            order = (
+                                "hits, accessed_at" if self.policy.eviction == 'lfu'
+                                else "accessed_at"
+                            )
+                            removed += self._conn.execute(
+                                "DELETE FROM address_cache WHERE cache_key IN ("
+                                f"SELECT cache_key FROM address_cache ORDER BY {order} LIMIT ?)",
+                                (excess,)
+                            ).rowcount
+            except Exception as e:
+                self.logger.error(f"Error evicting cache entries: {str(e)}")
+                return 0
+        if removed:
+            self.logger.info(f"Evicted {removed} address cache entries")
+        return removed
+
+    def rekey(self, key_func, version):
+        """Re-key entries from their full_address when the key scheme changes."""
+        self.flush()
+        with self._lock, self._conn:
+            # Hold the write lock from the version check so only one process re-keys
+            self._conn.execute("BEGIN IMMEDIATE")
+            current = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if current >= version:
+                return 0
+
+            rekeyed = {}
+            for full_address, components, expires_at, accessed_at, hits in self._conn.execute(
+                "SELECT full_address, components, expires_at, accessed_at, hits FROM address_cache"
+            ):
+                key = key_func(full_address)
+                if key and key not in rekeyed:
+                    rekeyed[key] = (key, full_address, components, expires_at, accessed_at, hits)
+
+            self._conn.execute("DELETE FROM address_cache")
+            self._conn.executemany(
+                "INSERT INTO address_cache "
+                "(cache_key, full_address, components, expires_at, accessed_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rekeyed.values()
+            )
+            self._conn.execute(f"PRAGMA user_version = {int(version)}")
+        if rekeyed:
+            self.logger.info(f"Re-keyed {len(rekeyed)} cache entries to key version {version}")
+        return len(rekeyed)
+
+    def _migrate_legacy(self):
+        """Import entries from the JSONL or JSON caches into a new database."""
+        legacy_jsonl = os.path.join(self.cache_dir, "address_cache.jsonl")
+        legacy_json = os.path.join(self.cache_dir, "address_cache.json")
+        try:
+            # Read the old files directly; opening a JSONL cache would create one
+            if os.path.exists(legacy_jsonl):
+                entries = self._read_legacy_jsonl(legacy_jsonl)
+            elif os.path.exists(legacy_json):
+                with open(legacy_json, 'r') as f:
+                    entries = json.load(f)
+            else:
+                return
+            with self._lock:
+                self._write(entries)
+            self.logger.info(f"Migrated {len(entries)} cache entries into {self.path}")
+        except Exception as e:
+            self.logger.error(f"Error migrating legacy cache: {str(e)}")
+
+    @staticmethod
+    def _read_legacy_jsonl(path):
+        """Latest unexpired entry per key from a JSONL cache log."""
+        entries = {}
+        now = time.time()
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                key = record.pop('key', None)
+                expires_at = record.pop('expires_at', None)
+                if key is None:
+                    continue
+                if expires_at is not None and expires_at <= now:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = record
+        return entries
+
+    def close(self):
+        """Flush pending entries and close the connection."""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+CACHE_BACKENDS = {
+    'sqlite': SqliteAddressCache,
+    'jsonl': JsonlAddressCache,
+}
+
+
+def open_address_cache(backend=None, **kwargs):
+    """Open the configured address cache backend (sqlite by default)."""
+    backend = (backend or os.getenv('ADDRESS_CACHE_BACKEND') or 'sqlite').lower()
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown address cache backend: {backend}")
+    return CACHE_BACKENDS[backend](**kwargs)
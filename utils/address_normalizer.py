@@ -0,0 +1,172 @@
+# utils/address_normalizer.py
+import re
+import hashlib
+from functools import lru_cache
+from utils.abbreviations import ADDRESS_ABBREVIATIONS
+from utils.zip_reference import STATE_NAMES
+
+# Unit designators and the canonical type each one maps to
+UNIT_DESIGNATORS = {
+    '#': 'unit', 'apt': 'unit', 'apartment': 'unit', 'unit': 'unit',
+    'ste': 'suite', 'suite': 'suite',
+    'fl': 'floor', 'floor': 'floor',
+    'rm': 'room', 'room': 'room',
+    'ph': 'penthouse', 'penthouse': 'penthouse',
+}
+
+# Address cleaning: drop stray symbols, collapse whitespace, upper-case state codes.
+# Letters (accented too), fractions and apostrophes are kept so "123 1/2 Main St"
+# and "O'Brien Pl" reach the geocoder intact
+SPECIAL_CHARS_PATTERN = re.compile(r"[^\w\s,\.#\-/']|_")
+WHITESPACE_PATTERN = re.compile(r'\s+')
+STATE_ZIP_PATTERN = re.compile(r',\s*([A-Za-z]+)\s+(\d{5})')
+DEFAULT_CLEAN_CACHE_SIZE = 10000
+
+TOKEN_PATTERN = re.compile(r'#|[a-z0-9]+')
+ORDINAL_PATTERN = re.compile(r'^(\d+)(?:st|nd|rd|th)$')
+ZIP_PATTERN = re.compile(r'^\d{5}$')
+ZIP4_PATTERN = re.compile(r'^\d{4}$')
+
+# Bump when the key scheme changes so persisted cache keys are rebuilt:
+# 1 - MD5 of the lower-cased address (the original cache, never versioned)
+# 2 - MD5 of canonical_address of the address as given
+# 3 - MD5 of canonical_address of the cleaned address, so raw input and the
+#     cleaned full_address stored with each entry always give the same key
+CANONICAL_KEY_VERSION = 3
+
+TOKEN_EXPANSIONS = {abbr.lower(): word.lower() for abbr, word in ADDRESS_ABBREVIATIONS.items()}
+STATE_TOKENS = {code.lower(): code for code in STATE_NAMES}
+STATE_NAME_TOKENS = {tuple(name.lower().split()): code for code, name in STATE_NAMES.items()}
+MAX_STATE_NAME_TOKENS = max(len(tokens) for tokens in STATE_NAME_TOKENS)
+
+
+def _upper_state(match):
+    return f", {match.group(1).upper()} {match.group(2)}"
+
+
+def _clean_address(address):
+    """Clean and normalize an address string (uncached)."""
+    if not address:
+        return address
+    address = SPECIAL_CHARS_PATTERN.sub('', str(address))
+    address = WHITESPACE_PATTERN.sub(' ', address).strip()
+    return STATE_ZIP_PATTERN.sub(_upper_state, address)
+
+
+_clean_address_cached = lru_cache(maxsize=DEFAULT_CLEAN_CACHE_SIZE)(_clean_address)
+
+
+def configure_clean_cache(maxsize):
+    """Resize the per-process clean_address memo; 0 disables it, None is unbounded."""
+    global _clean_address_cached
+    if _clean_address_cached.cache_parameters()['maxsize'] != maxsize:
+        _clean_address_cached = lru_cache(maxsize=maxsize)(_clean_address)
+
+
+def clean_address(address):
+    """Clean and normalize an address string, memoized per process."""
+    return _clean_address_cached(address)
+
+
+def clean_address_series(addresses):
+    """Vectorized clean_address over a Series; missing values pass through."""
+    text = addresses.astype(object).where(addresses.isna(), addresses.astype(str))
+    return (
+        text.str.replace(SPECIAL_CHARS_PATTERN, '', regex=True)
+        .str.replace(WHITESPACE_PATTERN, ' ', regex=True)
+        .str.strip()
+        .str.replace(STATE_ZIP_PATTERN, _upper_state, regex=True)
+    )
+
+
+def tokenize_address(address):
+    """Lower-case word tokens with punctuation dropped and '#' kept as its own token."""
+    return TOKEN_PATTERN.findall(str(address).lower().replace("'", ''))
+
+
+def _split_zip(tokens):
+    """Pop a trailing ZIP (dropping any ZIP+4 extension)."""
+    if len(tokens) >= 2 and ZIP_PATTERN.match(tokens[-2]) and ZIP4_PATTERN.match(tokens[-1]):
+        tokens = tokens[:-1]
+    if tokens and ZIP_PATTERN.match(tokens[-1]):
+        return tokens[:-1], tokens[-1]
+    return tokens, ''
+
+
+def _split_state(tokens):
+    """Pop a trailing state name or code as its two-letter code."""
+    for size in range(min(MAX_STATE_NAME_TOKENS, len(tokens)), 1, -1):
+        code = STATE_NAME_TOKENS.get(tuple(tokens[-size:]))
+        if code:
+            return tokens[:-size], code
+    if tokens:
+        code = STATE_TOKENS.get(tokens[-1]) or STATE_NAME_TOKENS.get((tokens[-1],))
+        if code:
+            return tokens[:-1], code
+    return tokens, ''
+
+
+def _split_units(tokens):
+    """Remove unit designators and their identifiers; return (tokens, units)."""
+    remaining = []
+    units = []
+    i = 0
+    while i < len(tokens):
+        designator = UNIT_DESIGNATORS.get(tokens[i])
+        # A designator needs something before it (the street) to count as a unit
+        if designator and remaining:
+            following = tokens[i + 1] if i + 1 < len(tokens) else ''
+            if designator == 'penthouse' and not any(ch.isdigit() for ch in following):
+                units.append('penthouse')
+                i += 1
+                continue
+            if following and following not in UNIT_DESIGNATORS:
+                units.append(f"{designator} {following}")
+                i += 2
+                continue
+            i += 1
+            continue
+        remaining.append(tokens[i])
+        i += 1
+    return remaining, units
+
+
+def normalize_address(address):
+    """Split an address into canonical street, unit, state and ZIP parts.
+
+    Street and city words stay together since formatting variants disagree on
+    where the commas go; abbreviations and ordinals are expanded/stripped.
+    """
+    tokens = tokenize_address(address)
+    tokens, zipcode = _split_zip(tokens)
+    tokens, state = _split_state(tokens)
+    tokens, units = _split_units(tokens)
+
+    words = []
+    for token in tokens:
+        ordinal = ORDINAL_PATTERN.match(token)
+        if ordinal:
+            token = ordinal.group(1)
+        words.append(TOKEN_EXPANSIONS.get(token, token))
+
+    return {
+        'street': ' '.join(words),
+        'units': units,
+        'state': state,
+        'zipcode': zipcode
+    }
+
+
+def canonical_address(address):
+    """Canonical text form shared by formatting variants of the same address."""
+    parts = normalize_address(address)
+    locality = f"{parts['state']} {parts['zipcode']}".strip()
+    sections = [parts['street'], ' '.join(parts['units']), locality]
+    return ' | '.join(section for section in sections if section)
+
+
+def canonical_address_key(address):
+    """Hash of the canonical form of the cleaned address, used as the cache key."""
+    if not address or not isinstance(address, str):
+        return None
+    return hashlib.md5(canonical_address(clean_address(address)).encode()).hexdigest()
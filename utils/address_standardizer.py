@@ -1,47 +1,66 @@
 # utils/address_standardizer.py
 import os
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError, GeocoderQuotaExceeded
-from geopy.extra.rate_limiter import RateLimiter
 import logging
 from dotenv import load_dotenv
-import time
 import re
-from functools import lru_cache
 import concurrent.futures
-import threading
-import random
-import json
-import hashlib
+import asyncio
+from utils.abbreviations import expand_abbreviations
+from utils.address_cache import open_address_cache, SqliteAddressCache
+from utils.request_scheduler import RequestScheduler, RequestFailed
+from utils.geocoders import open_geocoder
+from utils.zip_reference import ZipReference
+from utils.address_normalizer import (
+    canonical_address_key,
+    clean_address,
+    configure_clean_cache,
+    CANONICAL_KEY_VERSION
+)
 
 class AddressStandardizer:
     """Optimized address standardizer with enhanced parsing and caching."""
     
-    def __init__(self):
+    def __init__(self, geocoder=None):
         load_dotenv()
         
         # Configure logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         
-        # Get user agent from environment variables
-        self.user_agent = os.getenv('NOMINATIM_USER_AGENT')
-        if not self.user_agent:
-            raise ValueError("NOMINATIM_USER_AGENT not found in environment variables")
+        # Geocoder backend (GEOCODER_BACKEND, Nominatim by default)
+        self.geocoder = geocoder or open_geocoder()
         
-        # Initialize thread-local storage for geocoders
-        self._thread_local = threading.local()
-        
-        # Cache for standardized addresses
-        self._address_cache = {}
+        # Cache for standardized addresses (opened lazily, no bulk load)
+        self._address_cache = None
         self._load_cache()
         
-        # Rate limiting settings
-        self.min_delay = 1.1
-        self.max_delay = 2.0
+        # Rate limiting settings come from the backend (public Nominatim allows
+        # 1 request per second; a self-hosted server starts faster)
+        self.requests_per_second = self.geocoder.requests_per_second
         self.max_retries = 5
-        self.error_wait = 5.0
-        self.batch_size = 10
+        self.error_wait = self.geocoder.error_wait
+        self.max_workers = int(os.getenv('GEOCODER_MAX_WORKERS', '3'))
+        self.max_concurrency = 32
+        self.checkpoint_every = 50
+        
+        # One scheduler owns pacing, retries and backoff for every geocoding path;
+        # local backends skip pacing, and AIMD applies when the backend has headroom
+        self.scheduler = RequestScheduler(
+            self.requests_per_second,
+            max_rate=self.geocoder.max_requests_per_second,
+            max_retries=self.max_retries,
+            error_wait=self.error_wait,
+            paced=self.geocoder.rate_limited
+        )
+        
+        # Tiered resolution: 'tiered' geocodes only low-confidence regex parses,
+        # 'verify' geocodes everything, 'local' never calls the geocoder
+        self.resolution_mode = os.getenv('ADDRESS_RESOLUTION_MODE', 'tiered').lower()
+        self.confidence_threshold = float(os.getenv('ADDRESS_CONFIDENCE_THRESHOLD', '0.9'))
+        self.zip_reference = ZipReference()
+        
+        # Process-wide memo for address cleaning, shared by every instance
+        configure_clean_cache(int(os.getenv('ADDRESS_CLEAN_CACHE_SIZE', '10000')))
         
         # Address parsing patterns
         self.address_patterns = [
@@ -52,84 +71,34 @@ class AddressStandardizer:
             # Pattern 3: Basic format
             r'^(.*?),\s*([^,]+),\s*([^,]+)\s*(\d{5})(?:-\d{4})?$'
         ]
-        
-        self._init_rate_limiter()
-
-    def _init_rate_limiter(self):
-        """Initialize rate limiter with conservative settings."""
-        self.geocode = RateLimiter(
-            self.geolocator.geocode,
-            min_delay_seconds=self.min_delay,
-            max_retries=self.max_retries,
-            error_wait_seconds=self.error_wait,
-            swallow_exceptions=False
-        )
-
-    @property
-    def geolocator(self):
-        """Thread-safe geolocator instance with rotating user agents."""
-        if not hasattr(self._thread_local, 'geolocator'):
-            thread_id = threading.get_ident()
-            user_agent = f"{self.user_agent}_{thread_id}_{random.randint(1000, 9999)}"
-            
-            self._thread_local.geolocator = Nominatim(
-                user_agent=user_agent,
-                timeout=10
-            )
-        return self._thread_local.geolocator
-
-    def _get_cache_file(self):
-        """Get cache file path."""
-        cache_dir = "data/cache"
-        os.makedirs(cache_dir, exist_ok=True)
-        return os.path.join(cache_dir, "address_cache.json")
 
     def _load_cache(self):
-        """Load address cache from file."""
+        """Open the persistent address cache backend."""
         try:
-            cache_file = self._get_cache_file()
-            if os.path.exists(cache_file):
-                with open(cache_file, 'r') as f:
-                    self._address_cache = json.load(f)
+            self._address_cache = open_address_cache()
+            
+            # Entries written under an older key scheme are re-keyed once
+            self._address_cache.rekey(canonical_address_key, CANONICAL_KEY_VERSION)
         except Exception as e:
             self.logger.error(f"Error loading cache: {str(e)}")
-            self._address_cache = {}
+            self._address_cache = SqliteAddressCache(filename=':memory:')
+
+    def checkpoint_settings(self):
+        """Settings that change standardized results; run checkpoints are keyed on them."""
+        return {
+            'resolution_mode': self.resolution_mode,
+            'confidence_threshold': self.confidence_threshold,
+            'geocoder': self.geocoder.name,
+            'key_version': CANONICAL_KEY_VERSION
+        }
 
     def _save_cache(self):
-        """Save address cache to file."""
-        try:
-            cache_file = self._get_cache_file()
-            with open(cache_file, 'w') as f:
-                json.dump(self._address_cache, f)
-        except Exception as e:
-            self.logger.error(f"Error saving cache: {str(e)}")
+        """Flush queued cache entries to disk."""
+        self._address_cache.flush()
 
     def _get_cache_key(self, address):
-        """Generate cache key for address."""
-        if not address:
-            return None
-        return hashlib.md5(address.lower().encode()).hexdigest()
-
-    @lru_cache(maxsize=1000)
-    def _clean_address(self, address):
-        """Clean and normalize address string."""
-        if not address:
-            return address
-        
-        # Convert to string and clean
-        address = str(address)
-        
-        # Remove extra spaces
-        address = re.sub(r'\s+', ' ', address.strip())
-        
-        # Remove special characters except essential ones
-        address = re.sub(r'[^a-zA-Z0-9\s,\.#\-]', '', address)
-        
-        # Standardize state abbreviations
-        state_pattern = r',\s*([A-Za-z]+)\s+(\d{5})'
-        address = re.sub(state_pattern, lambda m: f", {m.group(1).upper()} {m.group(2)}", address)
-        
-        return address
+        """Generate cache key for address from its canonical form."""
+        return canonical_address_key(address)
 
     def parse_normalized_address(self, full_address):
         """Parse address into components with enhanced validation."""
@@ -139,64 +108,79 @@ class AddressStandardizer:
             
             # Check cache first
             cache_key = self._get_cache_key(full_address)
-            if cache_key in self._address_cache:
-                return self._address_cache[cache_key].get('components')
-            
-            # Clean the address
-            cleaned_address = self._clean_address(full_address)
+            cached = self._address_cache.get(cache_key)
+            if cached is not None:
+                return cached.get('components')
             
-            # Try multiple parsing strategies in order
-            components = (
-                self._try_regex_patterns(cleaned_address) or
-                self._geocode_address(cleaned_address) or
-                self._manual_parse(cleaned_address)
-            )
-            
-            if components:
-                # Ensure no abbreviations in components
-                components = self._expand_abbreviations(components)
-                self._cache_result(cache_key, cleaned_address, components)
-                
-            return components
+            return self._standardize_uncached(full_address)['components']
             
         except Exception as e:
             self.logger.error(f"Error parsing address: {str(e)}")
             return None
 
-    def _expand_abbreviations(self, components):
-        """Expand common address abbreviations."""
-        street_abbrev = {
-            'St': 'Street', 'Ave': 'Avenue', 'Rd': 'Road', 'Blvd': 'Boulevard',
-            'Ln': 'Lane', 'Dr': 'Drive', 'Ct': 'Court', 'Pl': 'Place',
-            'Ter': 'Terrace', 'Cir': 'Circle', 'Hwy': 'Highway'
-        }
+    def _local_tier(self, cleaned_address):
+        """Regex parse and confidence score; returns (components, confidence, needs_network)."""
+        components = self._try_regex_patterns(cleaned_address)
+        confidence = self.zip_reference.confidence(components)
         
-        direction_abbrev = {
-            'N': 'North', 'S': 'South', 'E': 'East', 'W': 'West',
-            'NE': 'Northeast', 'NW': 'Northwest', 'SE': 'Southeast', 'SW': 'Southwest'
-        }
+        if self.resolution_mode == 'local':
+            needs_network = False
+        elif self.resolution_mode == 'verify':
+            needs_network = True
+        else:
+            needs_network = components is None or confidence < self.confidence_threshold
+        return components, confidence, needs_network
+
+    def _finish_resolution(self, address, cleaned_address, components, confidence, geocoded,
+                           geocoder_answered=False, geocoder_gave_up=False):
+        """Pick the winning tier, expand and cache the components, and build the result."""
+        # Discard geocoder answers whose state contradicts their ZIP
+        if geocoded and not self.zip_reference.is_valid(geocoded):
+            geocoded = None
+        
+        if geocoded:
+            components = geocoded
+            tier = 'network'
+            confidence = self.zip_reference.confidence(geocoded)
+        elif components and not (self.resolution_mode == 'tiered' and
+                                 confidence < self.confidence_threshold):
+            tier = 'local'
+        else:
+            # Geocoding failed or was skipped: keep a low-confidence parse if there is one
+            components = components or self._manual_parse(cleaned_address)
+            tier = 'fallback' if components else 'unresolved'
+            confidence = self.zip_reference.confidence(components)
         
         if components:
-            # Expand street abbreviations
-            address = components['Address']
-            for abbr, full in street_abbrev.items():
-                pattern = fr'\b{abbr}\b'
-                address = re.sub(pattern, full, address)
-            
-            # Expand directional abbreviations
-            for abbr, full in direction_abbrev.items():
-                pattern = fr'\b{abbr}\b'
-                address = re.sub(pattern, full, address)
-            
-            components['Address'] = address
+            # Ensure no abbreviations in components
+            components = self._expand_abbreviations(components)
+            if tier != 'fallback':
+                self._cache_result(self._get_cache_key(address), cleaned_address, components)
+            elif not geocoder_gave_up:
+                # Unverified parses expire on the short negative TTL and are then re-checked
+                self._cache_result(
+                    self._get_cache_key(address), cleaned_address, components, provisional=True
+                )
+        elif geocoder_answered:
+            # The geocoder definitively found nothing: remember that briefly so bad
+            # addresses are not re-geocoded every run. Outages are never cached.
+            self._cache_failure(self._get_cache_key(address), cleaned_address)
+        
+        return {
+            'full_address': address,
+            'components': components,
+            'tier': tier,
+            'confidence': confidence
+        }
+
+    def _expand_abbreviations(self, components):
+        """Expand common address abbreviations."""
+        if components:
+            # Expand street and directional abbreviations in one pass
+            components['Address'] = expand_abbreviations(components['Address'])
             
             # Ensure state is not abbreviated
-            state_mapping = {
-                'NY': 'New York', 'NJ': 'New Jersey', 'CT': 'Connecticut'
-                # Add more states as needed
-            }
-            if components['State'] in state_mapping:
-                components['State'] = state_mapping[components['State']]
+            components['State'] = self.zip_reference.state_name(components['State'])
         
         return components
 
@@ -213,67 +197,28 @@ class AddressStandardizer:
                 }
         return None
 
-    def _geocode_address(self, address):
-        """Geocode address using Nominatim with retries."""
-        for attempt in range(self.max_retries):
-            try:
-                time.sleep(random.uniform(self.min_delay, self.max_delay))
-                
-                location = self.geolocator.geocode(
-                    address,
-                    addressdetails=True,
-                    language='en',
-                    exactly_one=True
-                )
-                
-                if location and location.raw.get('address'):
-                    return self._extract_components(location.raw['address'])
-                    
-            except (GeocoderTimedOut, GeocoderQuotaExceeded):
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.error_wait * (attempt + 1))
-                continue
-                
-            except Exception as e:
-                self.logger.error(f"Geocoding error: {str(e)}")
-                break
+    def _geocode_address(self, address, metrics=None):
+        """Geocode under the request scheduler; returns (components, answered).
         
-        return None
+        answered is False when the scheduler gave up (rate limits, outages),
+        as opposed to the geocoder answering that it found nothing.
+        """
+        try:
+            return self.scheduler.call(self.geocoder.geocode_one, address, metrics=metrics), True
+        except RequestFailed:
+            return None, False
 
-    def _extract_components(self, address_parts):
-        """Extract address components from geocoded result."""
-        # Extract house number and street
-        house_number = address_parts.get('house_number', '')
-        street = address_parts.get('road', '') or address_parts.get('street', '')
-        
-        if house_number and street:
-            street_address = f"{house_number} {street}"
-        else:
-            street_address = street or house_number
-        
-        # Get city with multiple fallbacks
-        city = (address_parts.get('city') or 
-               address_parts.get('town') or 
-               address_parts.get('village') or 
-               address_parts.get('suburb') or
-               address_parts.get('neighbourhood'))
-        
-        # Get state and postal code
-        state = address_parts.get('state', '')
-        postal_code = address_parts.get('postcode', '')
-        
-        # Clean and standardize components
-        components = {
-            'Address': street_address.strip(),
-            'City': city.strip() if city else '',
-            'State': state.strip() if state else '',
-            'Zipcode': postal_code.strip() if postal_code else ''
-        }
+    async def _ageocode_address(self, address, metrics=None, ageocode=None):
+        """Async geocode under the same request scheduler; returns (components, answered).
         
-        # Validate components
-        if all(components.values()):
-            return components
-        return None
+        ageocode is the batch's lookup from geocoder.async_session().
+        """
+        try:
+            return await self.scheduler.acall(
+                ageocode or self.geocoder.ageocode_one, address, metrics=metrics
+            ), True
+        except RequestFailed:
+            return None, False
 
     def _manual_parse(self, full_address):
         """Enhanced manual address parsing as final fallback."""
@@ -305,8 +250,8 @@ class AddressStandardizer:
                     'Zipcode': zipcode
                 }
                 
-                # Validate components
-                if all(components.values()):
+                # Validate components, including state against the ZIP reference
+                if all(components.values()) and self.zip_reference.is_valid(components):
                     return components
             
             return None
@@ -315,47 +260,190 @@ class AddressStandardizer:
             self.logger.error(f"Manual parsing error: {str(e)}")
             return None
 
-    def _cache_result(self, cache_key, address, components):
-        """Cache address parsing result."""
+    def _cache_result(self, cache_key, address, components, provisional=False):
+        """Cache address parsing result; provisional results get the negative TTL."""
         if cache_key and components:
-            self._address_cache[cache_key] = {
+            entry = {
                 'full_address': address,
                 'components': components
             }
-            self._save_cache()
+            if provisional:
+                entry['provisional'] = True
+            self._address_cache.put(cache_key, entry)
+
+    def _cache_failure(self, cache_key, address):
+        """Cache a failed lookup as a negative entry; it expires on the short negative TTL."""
+        if cache_key:
+            self._address_cache.put(cache_key, {'full_address': address, 'components': None})
 
-    def standardize_batch(self, addresses, max_workers=3):
-        """Standardize addresses in batches with enhanced error handling."""
+    def _standardize_uncached(self, address, metrics=None):
+        """Standardize a cache-miss address on a worker thread."""
+        try:
+            cleaned_address = clean_address(address)
+            components, confidence, needs_network = self._local_tier(cleaned_address)
+            geocoded, answered = None, False
+            if needs_network:
+                geocoded, answered = self._geocode_address(cleaned_address, metrics)
+            return self._finish_resolution(
+                address, cleaned_address, components, confidence, geocoded,
+                geocoder_answered=answered, geocoder_gave_up=needs_network and not answered
+            )
+        except Exception as e:
+            self.logger.error(f"Batch processing error for {address}: {str(e)}")
+            return self._unresolved(address)
+
+    async def _astandardize_uncached(self, address, metrics=None, ageocode=None):
+        """Async counterpart of _standardize_uncached; only geocoding is awaited."""
+        try:
+            cleaned_address = clean_address(address)
+            components, confidence, needs_network = self._local_tier(cleaned_address)
+            geocoded, answered = None, False
+            if needs_network:
+                geocoded, answered = await self._ageocode_address(
+                    cleaned_address, metrics, ageocode
+                )
+            return self._finish_resolution(
+                address, cleaned_address, components, confidence, geocoded,
+                geocoder_answered=answered, geocoder_gave_up=needs_network and not answered
+            )
+        except Exception as e:
+            self.logger.error(f"Batch processing error for {address}: {str(e)}")
+            return self._unresolved(address)
+
+    @staticmethod
+    def _unresolved(address):
+        return {
+            'full_address': address,
+            'components': None,
+            'tier': 'unresolved',
+            'confidence': 0.0
+        }
+
+    def _resolve_cached(self, addresses, completed_results=None):
+        """Split a batch into known results and the unique addresses still to process.
+        
+        Misses sharing a canonical key are processed once; the other spellings
+        are returned as aliases of the one that is processed.
+        """
         results = {}
-        total_addresses = len(addresses)
+        pending = []
+        aliases = {}
+        pending_keys = {}
         
-        for i in range(0, total_addresses, self.batch_size):
-            batch = addresses[i:i + self.batch_size]
-            
-            for address in batch:
-                try:
-                    # Check cache first
-                    cache_key = self._get_cache_key(address)
-                    if cache_key in self._address_cache:
-                        results[address] = self._address_cache[cache_key]
-                        continue
-                    
-                    # Process new address
-                    components = self.parse_normalized_address(address)
-                    results[address] = {
-                        'full_address': address,
-                        'components': components
-                    }
+        # Results recovered from an interrupted run are reused as-is
+        completed_results = completed_results or {}
+        
+        # Resolve the whole batch against the cache with bulk lookups
+        keys = {
+            address: self._get_cache_key(address)
+            for address in addresses if address not in completed_results
+        }
+        cached = self._address_cache.get_many(keys.values())
+        
+        for address in addresses:
+            if address in completed_results:
+                results[address] = completed_results[address]
+        
+        # Serve cache hits directly and queue each unique miss once
+        for address, cache_key in keys.items():
+            if cache_key in cached:
+                # Negative entries count as unresolved rather than cache hits
+                entry = cached[cache_key]
+                results[address] = {**entry, 'tier': 'cache' if entry.get('components') else 'unresolved'}
+            elif cache_key in pending_keys:
+                aliases.setdefault(pending_keys[cache_key], []).append(address)
+            else:
+                if cache_key is not None:
+                    pending_keys[cache_key] = address
+                pending.append(address)
+        
+        return results, pending, aliases
+
+    @staticmethod
+    def _store_result(results, aliases, address, result):
+        """Store a result for an address and its aliases; return the new entries."""
+        stored = {address: result}
+        for alias in aliases.get(address, ()):
+            stored[alias] = {**result, 'full_address': alias}
+        results.update(stored)
+        return stored
+
+    def standardize_batch(self, addresses, max_workers=None, progress_callback=None,
+                          completed_results=None, checkpoint_callback=None, metrics=None):
+        """Standardize addresses concurrently behind the shared rate limiter.
+        
+        Pass a RequestMetrics to collect this batch's geocoding figures apart
+        from other batches sharing the scheduler.
+        """
+        results, pending, aliases = self._resolve_cached(addresses, completed_results)
+        
+        # Progress is reported as (completed, total) unique addresses
+        total = len(results) + len(pending) + sum(map(len, aliases.values()))
+        if progress_callback:
+            progress_callback(len(results), total)
+        
+        if not pending:
+            return results
+        
+        # Workers overlap network latency; the token bucket alone paces requests
+        workers = max(1, min(max_workers or self.max_workers, len(pending)))
+        unrecorded = {}
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(self._standardize_uncached, address, metrics): address
+                    for address in pending
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    stored = self._store_result(
+                        results, aliases, futures[future], future.result()
+                    )
+                    unrecorded.update(stored)
+                    if progress_callback:
+                        progress_callback(len(results), total)
                     
-                except Exception as e:
-                    self.logger.error(f"Batch processing error for {address}: {str(e)}")
-                    results[address] = {
-                        'full_address': address,
-                        'components': None
-                    }
-            
-            # Delay between batches
-            time.sleep(random.uniform(self.min_delay, self.max_delay))
+                    # Checkpoint progress periodically so a crash loses little work
+                    if checkpoint_callback and len(unrecorded) >= self.checkpoint_every:
+                        self._save_cache()
+                        checkpoint_callback(unrecorded)
+                        unrecorded = {}
+        finally:
+            # Persist everything learned in this batch with a single append
+            self._save_cache()
+            if checkpoint_callback:
+                checkpoint_callback(unrecorded)
+        
+        return results
+
+    async def astandardize_batch(self, addresses, max_concurrency=None, progress_callback=None,
+                                 metrics=None):
+        """Standardize addresses on the event loop with many lookups in flight."""
+        results, pending, aliases = self._resolve_cached(addresses)
+        
+        total = len(results) + len(pending) + sum(map(len, aliases.values()))
+        if progress_callback:
+            progress_callback(len(results), total)
+        
+        if not pending:
+            return results
+        
+        # The semaphore bounds open requests; the token bucket still paces them
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        
+        # Connections belong to this batch, so concurrent batches never close each other's
+        try:
+            async with self.geocoder.async_session() as ageocode:
+                async def run(address):
+                    async with semaphore:
+                        return await self._astandardize_uncached(address, metrics, ageocode)
+                
+                for task in asyncio.as_completed([run(address) for address in pending]):
+                    result = await task
+                    self._store_result(results, aliases, result['full_address'], result)
+                    if progress_callback:
+                        progress_callback(len(results), total)
+        finally:
+            self._save_cache()
         
         return results
 
@@ -365,19 +453,13 @@ class AddressStandardizer:
             return {'full_address': address, 'components': None}
         
         try:
-            cache_key = self._get_cache_key(address)
-            if cache_key in self._address_cache:
-                return self._address_cache[cache_key]
-            
-            components = self.parse_normalized_address(address)
-            result = {
-                'full_address': address,
-                'components': components
-            }
-            
-            if components:
-                self._cache_result(cache_key, address, components)
+            cached = self._address_cache.get(self._get_cache_key(address))
+            if cached is not None:
+                return cached
             
+            # Resolution caches its own result with the right TTL
+            result = self._standardize_uncached(address)
+            self._save_cache()
             return result
             
         except Exception as e:
@@ -0,0 +1,112 @@
+# utils/checkpoint.py
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+import pandas as pd
+from utils.history_store import HistoryStore
+
+
+class RunCheckpoint:
+    """Stage checkpoints for one processing run, kept under data/checkpoints/<run_id>.
+
+    Runs with different settings get separate directories, so a changed
+    configuration never resumes from results produced under the old one.
+    """
+
+    def __init__(self, run_id, base_dir="data/checkpoints", settings=None):
+        if settings:
+            digest = hashlib.md5(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+            run_id = f"{run_id}_{digest[:12]}"
+        self.run_id = run_id
+        self.run_dir = os.path.join(base_dir, run_id)
+        self.addresses_path = os.path.join(self.run_dir, "standardized_addresses.jsonl")
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # The run directory is created on the first save, so runs that stop
+        # before saving anything leave nothing behind
+
+    def _frame_path(self, stage):
+        return os.path.join(self.run_dir, f"{stage}.parquet")
+
+    def _stats_path(self, stage):
+        return os.path.join(self.run_dir, f"{stage}_stats.json")
+
+    def _dtypes_path(self, stage):
+        return os.path.join(self.run_dir, f"{stage}_dtypes.json")
+
+    def has(self, stage):
+        """Check whether a stage finished in an earlier attempt."""
+        return os.path.exists(self._frame_path(stage))
+
+    def save_frame(self, stage, df, stats=None):
+        """Persist a stage's output frame (and optional stats) atomically."""
+        try:
+            os.makedirs(self.run_dir, exist_ok=True)
+            if stats is not None:
+                with open(self._stats_path(stage), 'w') as f:
+                    json.dump(stats, f, default=int)
+            # Remember the in-memory dtypes so a resumed run gets the same frame back
+            with open(self._dtypes_path(stage), 'w') as f:
+                json.dump({col: str(dtype) for col, dtype in df.dtypes.items()}, f)
+            # Same typed Parquet layout as stored outputs
+            tmp_path = f"{self._frame_path(stage)}.tmp"
+            HistoryStore.prepare_output_types(df).to_parquet(tmp_path)
+            os.replace(tmp_path, self._frame_path(stage))
+        except Exception as e:
+            self.logger.error(f"Error saving {stage} checkpoint: {str(e)}")
+
+    def load_frame(self, stage):
+        """Load a stage's frame and stats (stats is None if none were saved)."""
+        df = self._restore_dtypes(stage, pd.read_parquet(self._frame_path(stage)))
+        stats = None
+        if os.path.exists(self._stats_path(stage)):
+            with open(self._stats_path(stage), 'r') as f:
+                stats = json.load(f)
+        return df, stats
+
+    def _restore_dtypes(self, stage, df):
+        """Undo the storage types (category, string) on columns that were plain objects."""
+        if not os.path.exists(self._dtypes_path(stage)):
+            return df
+        with open(self._dtypes_path(stage), 'r') as f:
+            dtypes = json.load(f)
+        for col, dtype in dtypes.items():
+            if col in df.columns and dtype == 'object' and df[col].dtype != object:
+                values = df[col].astype(object)
+                df[col] = values.where(values.notna(), None)
+        return df
+
+    def record_addresses(self, results):
+        """Append newly standardized address results."""
+        if not results:
+            return
+        with self._lock:
+            try:
+                os.makedirs(self.run_dir, exist_ok=True)
+                with open(self.addresses_path, 'a') as f:
+                    for address, result in results.items():
+                        f.write(json.dumps({'address': address, 'result': result}) + '\n')
+            except Exception as e:
+                self.logger.error(f"Error recording address checkpoint: {str(e)}")
+
+    def load_addresses(self):
+        """Return the address results recorded so far."""
+        results = {}
+        if not os.path.exists(self.addresses_path):
+            return results
+        with open(self.addresses_path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Skip a torn final line from an interrupted append
+                    continue
+                results[record['address']] = record['result']
+        return results
+
+    def clear(self):
+        """Remove the checkpoint once the run has completed."""
+        shutil.rmtree(self.run_dir, ignore_errors=True)
@@ -1,17 +1,25 @@
 # utils/data_processor.py
-import re
 import pandas as pd
+import openpyxl
 from datetime import datetime
 import logging
-from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from utils.address_standardizer import AddressStandardizer
+from utils.checkpoint import RunCheckpoint
+from utils.request_scheduler import RequestMetrics
+from utils.address_normalizer import clean_address_series
+from utils.abbreviations import (
+    expand_abbreviations_series,
+    find_unexpanded_abbreviations,
+    count_unexpanded_abbreviations
+)
 
 class DataProcessor:
     def __init__(self, valid_property_classes):
         """Initialize DataProcessor with enhanced address handling."""
         self.valid_property_classes = valid_property_classes
         self.address_standardizer = AddressStandardizer()
+        self.zip_reference = self.address_standardizer.zip_reference
         self.logger = logging.getLogger(__name__)
         
         # Property class descriptions
@@ -37,6 +45,16 @@ class DataProcessor:
         
         # Address component columns
         self.address_components = ['Address', 'City', 'State', 'Zipcode']
+        
+        # Columns always read as text, and rows per streamed chunk
+        self.text_columns = self.address_components + ['Property class', 'Full Address']
+        self.chunk_size = 10000
+        
+        # Tiers reported for standardized addresses, cheapest first
+        self.resolution_tiers = ['cache', 'local', 'network', 'fallback', 'unresolved']
+        
+        # Interrupted runs keep their stage outputs here until they finish
+        self.checkpoint_dir = "data/checkpoints"
 
     def standardize_property_class(self, property_class):
         """Standardize property class format."""
@@ -50,49 +68,90 @@ class DataProcessor:
             return pd.read_excel(
                 file_path,
                 engine='openpyxl',
-                dtype={
-                    'Zipcode': str,
-                    'Address': str,
-                    'City': str,
-                    'State': str,
-                    'Property class': str,
-                    'Full Address': str
-                }
+                dtype={col: str for col in self.text_columns}
             )
         except Exception as e:
             self.logger.error(f"Error loading data: {str(e)}")
             raise
 
+    def iter_data_chunks(self, file_path, chunk_size=None):
+        """Stream the first worksheet as DataFrame chunks using openpyxl read-only mode."""
+        chunk_size = chunk_size or self.chunk_size
+        try:
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        except Exception as e:
+            self.logger.error(f"Error loading data: {str(e)}")
+            raise
+        
+        try:
+            sheet = workbook.worksheets[0]
+            # Some writers store a wrong <dimension>; don't let it clip the rows read
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            
+            # Match pandas naming for blank and duplicate headers
+            columns = self._dedup_columns([
+                str(name) if name is not None else f"Unnamed: {i}"
+                for i, name in enumerate(header)
+            ])
+            width = len(columns)
+            
+            buffer = []
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                # Read-only rows can be ragged; pad or trim to the header width
+                row = tuple(row[:width]) + (None,) * (width - len(row))
+                buffer.append(row)
+                if len(buffer) >= chunk_size:
+                    yield self._rows_to_frame(buffer, columns)
+                    buffer = []
+            
+            if buffer:
+                yield self._rows_to_frame(buffer, columns)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _dedup_columns(columns):
+        """Suffix repeated column names as pandas does ('Address', 'Address.1', ...)."""
+        counts = {}
+        deduped = []
+        for name in columns:
+            count = counts.get(name, 0)
+            while count > 0:
+                counts[name] = count + 1
+                name = f"{name}.{count}"
+                count = counts.get(name, 0)
+            deduped.append(name)
+            counts[name] = count + 1
+        return deduped
+
+    def _rows_to_frame(self, rows, columns):
+        """Build a chunk DataFrame with the same text handling as load_data."""
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        for col in self.text_columns:
+            if col in df.columns:
+                values = df[col]
+                present = values.notna()
+                df[col] = values.where(~present, values[present].map(self._cell_to_text))
+        return df
+
+    @staticmethod
+    def _cell_to_text(value):
+        """Convert a cell value to text the way read_excel(dtype=str) does."""
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value)
+
     def analyze_property_classes(self, df):
         """Analyze property classes with enhanced statistics."""
         try:
-            df = df.copy()
-            df["Property class"] = df["Property class"].apply(self.standardize_property_class)
-            
-            class_counts = df["Property class"].value_counts()
-            valid_classes = {cls: count for cls, count in class_counts.items() 
-                           if cls in self.valid_property_classes}
-            invalid_classes = {cls: count for cls, count in class_counts.items() 
-                             if cls not in self.valid_property_classes}
-            
-            filtered_df = df[df["Property class"].isin(self.valid_property_classes)]
-            co_count = len(df[df["Property class"].isin(["CO", "C0"])])
-            
-            stats = {
-                "total_records": len(df),
-                "valid_records": len(filtered_df),
-                "filtered_out": len(df) - len(filtered_df),
-                "valid_classes": {
-                    cls: {
-                        "count": count,
-                        "description": self.property_class_descriptions.get(cls, "Unknown"),
-                        "percentage": (count / len(df) * 100) if len(df) > 0 else 0
-                    }
-                    for cls, count in valid_classes.items()
-                },
-                "invalid_classes": invalid_classes,
-                "co_records": co_count
-            }
+            filtered_df, class_counts = self._filter_property_classes(df)
+            stats = self._build_class_stats(class_counts, len(df))
             
             return filtered_df, stats
             
@@ -100,7 +159,40 @@ class DataProcessor:
             self.logger.error(f"Error analyzing property classes: {str(e)}")
             raise
 
-    def standardize_addresses(self, df, status_callback=None):
+    def _filter_property_classes(self, df):
+        """Standardize property classes and return valid rows with class counts."""
+        df = df.copy()
+        df["Property class"] = df["Property class"].replace(self.property_class_standardization)
+        filtered_df = df[df["Property class"].isin(self.valid_property_classes)]
+        return filtered_df, df["Property class"].value_counts()
+
+    def _build_class_stats(self, class_counts, total_records):
+        """Build property class statistics from class counts."""
+        valid_classes = {cls: count for cls, count in class_counts.items() 
+                       if cls in self.valid_property_classes}
+        invalid_classes = {cls: count for cls, count in class_counts.items() 
+                         if cls not in self.valid_property_classes}
+        valid_records = int(sum(valid_classes.values()))
+        co_count = int(sum(count for cls, count in class_counts.items() if cls in ["CO", "C0"]))
+        
+        return {
+            "total_records": total_records,
+            "valid_records": valid_records,
+            "filtered_out": total_records - valid_records,
+            "valid_classes": {
+                cls: {
+                    "count": count,
+                    "description": self.property_class_descriptions.get(cls, "Unknown"),
+                    "percentage": (count / total_records * 100) if total_records > 0 else 0
+                }
+                for cls, count in valid_classes.items()
+            },
+            "invalid_classes": invalid_classes,
+            "co_records": co_count
+        }
+
+    def standardize_addresses(self, df, status_callback=None, progress_callback=None,
+                              checkpoint=None, run_stats=None, metrics=None):
         """Enhanced address standardization with component splitting."""
         try:
             if status_callback:
@@ -110,69 +202,81 @@ class DataProcessor:
             if 'Full Address' not in df.columns:
                 df['Full Address'] = self.create_full_addresses(df)
             
+            # Clean into lookup keys in one pass so formatting variants dedupe
+            # together; the visible Full Address keeps the text as entered
+            address_keys = clean_address_series(df['Full Address'])
+            
             # Get unique addresses
-            unique_addresses = df['Full Address'].unique()
+            unique_addresses = address_keys.dropna().unique()
             total_addresses = len(unique_addresses)
             
             if status_callback:
                 status_callback(f"Standardizing {total_addresses} unique addresses...")
             
+            # Resume from addresses an interrupted run already standardized
+            completed_results = None
+            checkpoint_callback = None
+            if checkpoint:
+                completed_results = checkpoint.load_addresses()
+                checkpoint_callback = checkpoint.record_addresses
+                if completed_results and status_callback:
+                    status_callback(
+                        f"Resuming with {len(completed_results)} addresses from a previous run..."
+                    )
+            
             # Process addresses in batches
-            standardized_results = self.address_standardizer.standardize_batch(unique_addresses)
+            standardized_results = self.address_standardizer.standardize_batch(
+                unique_addresses,
+                progress_callback=progress_callback,
+                completed_results=completed_results,
+                checkpoint_callback=checkpoint_callback,
+                metrics=metrics
+            )
+            
+            # Count unique addresses by the tier that resolved them
+            tier_counts = self._count_resolution_tiers(standardized_results)
+            if run_stats is not None:
+                run_stats['resolution_tiers'] = tier_counts
             
             # Initialize address component columns
             for component in self.address_components:
                 if component not in df.columns:
                     df[component] = ''
             
-            # Validation function for addresses
-            def validate_address(row):
-                """Validate that no common abbreviations remain in the address."""
-                common_abbrevs = ['St', 'Ave', 'Rd', 'Blvd', 'Ln', 'Dr', 'Ct', 'Pl', 'Ft']
-                address = row['Address']
-                remaining_abbrevs = [abbr for abbr in common_abbrevs if f" {abbr}" in address]
-                if remaining_abbrevs:
-                    self.logger.warning(f"Found unexpanded abbreviations in address: {address}")
-                    return False
-                return True
-            
-            # Update DataFrame with standardized components
-            for idx, row in df.iterrows():
-                original_address = row['Full Address']
-                if original_address in standardized_results:
-                    result = standardized_results[original_address]
-                    if result.get('components'):
-                        components = result['components']
-                        
-                        # Update individual components with expanded forms
-                        if components.get('Address'):
-                            # Expand street abbreviations
-                            address = components['Address']
-                            address = self._expand_street_abbreviations(address)
-                            df.at[idx, 'Address'] = address
-                        
-                        if components.get('City'):
-                            df.at[idx, 'City'] = components['City']
-                        
-                        if components.get('State'):
-                            # Expand state abbreviations
-                            state = self._expand_state_abbreviation(components['State'])
-                            df.at[idx, 'State'] = state
-                        
-                        if components.get('Zipcode'):
-                            df.at[idx, 'Zipcode'] = components['Zipcode']
-                        
-                        # Update full address with expanded components
-                        full_address = f"{df.at[idx, 'Address']}, {df.at[idx, 'City']}, {df.at[idx, 'State']} {df.at[idx, 'Zipcode']}"
-                        df.at[idx, 'Full Address'] = full_address
-            
-            # Check for unexpanded abbreviations
-            unexpanded_addresses = df[~df.apply(validate_address, axis=1)]
-            if not unexpanded_addresses.empty:
+            # Join standardized components back onto every row in one pass
+            components_df = self._build_component_frame(standardized_results)
+            aligned = components_df.reindex(address_keys.to_numpy())
+            aligned.index = df.index
+            matched = address_keys.isin(components_df.index)
+            
+            for component in self.address_components:
+                df[component] = aligned[component].where(aligned[component].notna(), df[component])
+            
+            # Update full address with expanded components
+            df.loc[matched, 'Full Address'] = (
+                df.loc[matched, 'Address'].astype(str) + ', ' +
+                df.loc[matched, 'City'].astype(str) + ', ' +
+                df.loc[matched, 'State'].astype(str) + ' ' +
+                df.loc[matched, 'Zipcode'].astype(str)
+            )
+            
+            # Check for unexpanded abbreviations across the whole column at once
+            unexpanded_mask = find_unexpanded_abbreviations(df['Address'])
+            unexpanded_count = int(unexpanded_mask.sum())
+            if unexpanded_count:
+                abbreviation_counts = count_unexpanded_abbreviations(df.loc[unexpanded_mask, 'Address'])
+                sample = df.loc[unexpanded_mask, 'Full Address'].head(5).tolist()
+                self.logger.warning(
+                    f"Found {unexpanded_count} addresses with unexpanded abbreviations "
+                    f"({abbreviation_counts.to_dict()}), e.g. {sample}"
+                )
                 if status_callback:
-                    status_callback("\nWarning: Found addresses with unexpanded abbreviations:")
-                    for _, row in unexpanded_addresses.iterrows():
-                        status_callback(f"- {row['Full Address']}")
+                    message = f"\nWarning: Found {unexpanded_count} addresses with unexpanded abbreviations:"
+                    for address in sample:
+                        message += f"\n- {address}"
+                    if unexpanded_count > len(sample):
+                        message += f"\n- ... and {unexpanded_count - len(sample)} more"
+                    status_callback(message)
             
             # Ensure consistent column order
             columns = ['Full Address'] + self.address_components + [
@@ -193,77 +297,58 @@ class DataProcessor:
                 for component, count in filled_components.items():
                     percentage = (count / len(df)) * 100
                     stats_message += f"\n• {component}: {count} ({percentage:.1f}%)"
-                status_callback(stats_message)
+                
+                stats_message += "\n\nResolution Tiers (unique addresses):"
+                for tier, count in tier_counts.items():
+                    stats_message += f"\n• {tier}: {count}"
                 
                 # Add validation statistics
-                if not unexpanded_addresses.empty:
-                    stats_message += f"\n\n⚠️ Found {len(unexpanded_addresses)} addresses with unexpanded abbreviations"
+                if unexpanded_count:
+                    stats_message += f"\n\n⚠️ Found {unexpanded_count} addresses with unexpanded abbreviations"
+                status_callback(stats_message)
             
             return df
             
         except Exception as e:
+            # A half-standardized frame must never be reported (or checkpointed) as done
             self.logger.error(f"Error in standardize_addresses: {str(e)}")
-            return df
+            raise
+
+    def _count_resolution_tiers(self, standardized_results):
+        """Count standardized addresses per resolution tier."""
+        tier_counts = {tier: 0 for tier in self.resolution_tiers}
+        for result in standardized_results.values():
+            tier = result.get('tier', 'cache')
+            tier_counts[tier] = tier_counts.get(tier, 0) + 1
+        return tier_counts
 
-    def _expand_street_abbreviations(self, address):
-        """Expand common street abbreviations."""
-        street_abbrev = {
-            r'\bSt\b': 'Street',
-            r'\bAve\b': 'Avenue',
-            r'\bRd\b': 'Road',
-            r'\bBlvd\b': 'Boulevard',
-            r'\bLn\b': 'Lane',
-            r'\bDr\b': 'Drive',
-            r'\bCt\b': 'Court',
-            r'\bPl\b': 'Place',
-            r'\bTer\b': 'Terrace',
-            r'\bCir\b': 'Circle',
-            r'\bHwy\b': 'Highway',
-            r'\bPkwy\b': 'Parkway',
-            r'\bSq\b': 'Square',
-            r'\bFt\b': 'Fort',  # Added Fort abbreviation
-            # Directionals
-            r'\bN\b': 'North',
-            r'\bS\b': 'South',
-            r'\bE\b': 'East',
-            r'\bW\b': 'West',
-            r'\bNE\b': 'Northeast',
-            r'\bNW\b': 'Northwest',
-            r'\bSE\b': 'Southeast',
-            r'\bSW\b': 'Southwest'
+    def _build_component_frame(self, standardized_results):
+        """Build a component DataFrame indexed by the unique original address."""
+        records = {
+            address: result['components']
+            for address, result in standardized_results.items()
+            if result and result.get('components')
         }
+        components_df = pd.DataFrame.from_dict(
+            records, orient='index', columns=self.address_components
+        )
         
-        # First pass: expand standard abbreviations
-        for abbr, full in street_abbrev.items():
-            address = re.sub(abbr, full, address)
+        # Empty components leave the original column value untouched; keep object
+        # dtype so an all-empty column still takes .str operations
+        components_df = components_df.replace('', np.nan).astype(object)
         
-        # Second pass: catch remaining specific cases
-        specific_cases = {
-            r'Fort Greene Pl\b': 'Fort Greene Place',
-            r'Ft Greene Pl\b': 'Fort Greene Place',
-            r'Ft. Greene Pl\b': 'Fort Greene Place',
-            r'Fort Greene Pl.\b': 'Fort Greene Place',
-            # Add more specific cases as needed
-        }
+        # Expand abbreviations once per unique address rather than per row
+        components_df['Address'] = expand_abbreviations_series(components_df['Address'])
         
-        for case, replacement in specific_cases.items():
-            address = re.sub(case, replacement, address)
-        
-        return address
-
-    def _expand_state_abbreviation(self, state):
-        """Expand state abbreviations to full names."""
-        state_mapping = {
-            'NY': 'New York',
-            'NJ': 'New Jersey',
-            'CT': 'Connecticut',
-            'PA': 'Pennsylvania',
-            'MA': 'Massachusetts',
-            'FL': 'Florida',
-            'CA': 'California',
-            # Add more states as needed
-        }
-        return state_mapping.get(state, state)
+        # Fill State/City from the ZIP reference and expand state names in bulk
+        components_df, mismatched = self.zip_reference.enrich(components_df)
+        mismatch_count = int(mismatched.sum())
+        if mismatch_count:
+            sample = components_df.index[mismatched][:5].tolist()
+            self.logger.warning(
+                f"Found {mismatch_count} addresses whose state does not match the ZIP code, e.g. {sample}"
+            )
+        return components_df
 
     def create_full_addresses(self, df):
         """Create full addresses with enhanced component handling."""
@@ -273,21 +358,27 @@ class DataProcessor:
                 if col in df.columns:
                     df[col] = df[col].fillna('').astype(str).str.strip()
             
-            # Combine components with smart handling
-            def combine_components(row):
-                components = []
-                if row.get('Address'):
-                    components.append(row['Address'])
-                if row.get('City'):
-                    components.append(row['City'])
-                if row.get('State'):
-                    state_zip = row['State']
-                    if row.get('Zipcode'):
-                        state_zip += f" {row['Zipcode']}"
-                    components.append(state_zip)
-                return ', '.join(filter(None, components))
-            
-            return df.apply(combine_components, axis=1)
+            def component(col):
+                if col in df.columns:
+                    return df[col]
+                return pd.Series('', index=df.index, dtype=object)
+            
+            state = component('State')
+            zipcode = component('Zipcode')
+            
+            # Zipcode is only appended to a non-empty state
+            state_zip = state.mask(state.ne('') & zipcode.ne(''), state + ' ' + zipcode)
+            
+            # Join non-empty parts with ', ' column-wise
+            full_address = pd.Series('', index=df.index, dtype=object)
+            for part in (component('Address'), component('City'), state_zip):
+                has_part = part.ne('')
+                full_address = full_address.mask(
+                    has_part,
+                    part.mask(full_address.ne(''), full_address + ', ' + part)
+                )
+            
+            return full_address
             
         except Exception as e:
             self.logger.error(f"Error creating full addresses: {str(e)}")
@@ -313,6 +404,43 @@ class DataProcessor:
             self.logger.error(f"Error in filter_data: {str(e)}")
             raise
 
+    def filter_chunks(self, chunks, status_callback=None):
+        """Filter streamed chunks by property class, keeping only valid rows in memory."""
+        try:
+            if status_callback:
+                status_callback("Analyzing property classes...")
+            
+            class_counts = pd.Series(dtype='int64')
+            filtered_chunks = []
+            total_records = 0
+            empty_frame = pd.DataFrame()
+            
+            for chunk in chunks:
+                total_records += len(chunk)
+                filtered_chunk, chunk_counts = self._filter_property_classes(chunk)
+                class_counts = class_counts.add(chunk_counts, fill_value=0)
+                
+                if len(filtered_chunk):
+                    filtered_chunks.append(filtered_chunk)
+                empty_frame = chunk.iloc[0:0]
+            
+            filtered_df = pd.concat(filtered_chunks) if filtered_chunks else empty_frame
+            filtered_df = filtered_df.reset_index(drop=True)
+            class_counts = class_counts.astype('int64').sort_values(ascending=False)
+            stats = self._build_class_stats(class_counts, total_records)
+            
+            if status_callback and total_records:
+                self._create_filter_status_message(stats, status_callback)
+            
+            # Drop unnecessary columns
+            filtered_df = filtered_df.drop(columns=["Block & Lot"], errors="ignore")
+            
+            return filtered_df, stats
+            
+        except Exception as e:
+            self.logger.error(f"Error in filter_chunks: {str(e)}")
+            raise
+
     def _create_filter_status_message(self, stats, status_callback):
         """Create detailed filter status message."""
         message = f"""
@@ -369,27 +497,89 @@ class DataProcessor:
 
     def process_file(self, file_path, status_callback=None):
         """Process file with enhanced address handling and validation."""
+        processed_df, _ = self.process_file_with_stats(file_path, status_callback)
+        return processed_df
+
+    def process_file_with_stats(self, file_path, status_callback=None, progress_callback=None,
+                                run_id=None):
+        """Process a workbook in one streamed parse; return (DataFrame, run stats)."""
+        if status_callback:
+            status_callback(f"Loading data in chunks of {self.chunk_size} rows...")
+        return self._process_chunks(
+            self.iter_data_chunks(file_path), status_callback, progress_callback,
+            self._open_checkpoint(run_id)
+        )
+
+    def process_dataframe(self, df, status_callback=None, progress_callback=None, run_id=None):
+        """Process an already-loaded DataFrame; return (DataFrame, run stats)."""
+        return self._process_chunks(
+            [df], status_callback, progress_callback, self._open_checkpoint(run_id)
+        )
+
+    def _open_checkpoint(self, run_id):
+        """Open the checkpoint for a run id; runs without an id are not checkpointed."""
+        if not run_id:
+            return None
         try:
-            if status_callback:
-                status_callback("Loading data...")
-            
-            df = self.load_data(file_path)
-            initial_count = len(df)
-            
-            if status_callback:
-                status_callback(f"Analyzing {initial_count} records...")
-            
-            # Filter and standardize
-            filtered_df, filter_stats = self.filter_data(df, status_callback)
+            return RunCheckpoint(
+                run_id, self.checkpoint_dir,
+                settings=self.address_standardizer.checkpoint_settings()
+            )
+        except Exception as e:
+            self.logger.error(f"Error opening checkpoint {run_id}: {str(e)}")
+            return None
+
+    def _process_chunks(self, chunks, status_callback=None, progress_callback=None,
+                        checkpoint=None):
+        """Run filter, standardize and dedupe over raw chunks."""
+        run_stats = {'initial_count': 0, 'filtered_count': 0, 'final_count': 0}
+        # Geocoding figures for this run only; other jobs share the scheduler
+        geocoding = RequestMetrics()
+        try:
+            if checkpoint and checkpoint.has('filtered'):
+                # The workbook was already filtered in an earlier attempt
+                filtered_df, filter_stats = checkpoint.load_frame('filtered')
+                if status_callback:
+                    status_callback("Resuming from filtered data of a previous run...")
+            else:
+                # Filter chunk by chunk so dropped rows never accumulate
+                filtered_df, filter_stats = self.filter_chunks(chunks, status_callback)
+                if checkpoint and len(filtered_df) > 0:
+                    checkpoint.save_frame('filtered', filtered_df, filter_stats)
+            initial_count = filter_stats['total_records']
+            run_stats.update(initial_count=initial_count, filtered_count=len(filtered_df))
+            
+            if initial_count == 0:
+                if status_callback:
+                    status_callback("❌ The uploaded file contains no records.")
+                return None, run_stats
             if len(filtered_df) == 0:
-                status_callback("❌ No valid property classes found.")
-                return None
+                if status_callback:
+                    status_callback("❌ No valid property classes found.")
+                return None, run_stats
             
             # Standardize addresses
-            standardized_df = self.standardize_addresses(filtered_df, status_callback)
+            if checkpoint and checkpoint.has('standardized'):
+                standardized_df, tier_counts = checkpoint.load_frame('standardized')
+                if tier_counts:
+                    run_stats['resolution_tiers'] = tier_counts
+            else:
+                standardized_df = self.standardize_addresses(
+                    filtered_df, status_callback, progress_callback, checkpoint, run_stats,
+                    geocoding
+                )
+                if checkpoint:
+                    checkpoint.save_frame(
+                        'standardized', standardized_df, run_stats.get('resolution_tiers')
+                    )
             
             # Remove duplicates
-            deduped_df = self.remove_duplicates(standardized_df)
+            if checkpoint and checkpoint.has('deduped'):
+                deduped_df, _ = checkpoint.load_frame('deduped')
+            else:
+                deduped_df = self.remove_duplicates(standardized_df)
+                if checkpoint:
+                    checkpoint.save_frame('deduped', deduped_df)
             
             # Add metadata
             deduped_df["Processed Date"] = datetime.now().strftime("%B %d, %Y at %I:%M %p")
@@ -420,13 +610,24 @@ class DataProcessor:
                     status_callback
                 )
             
-            return deduped_df
+            run_stats['final_count'] = len(deduped_df)
+            run_stats['geocoding'] = {
+                **geocoding.snapshot(),
+                'rate': self.address_standardizer.scheduler.rate
+            }
+            
+            # The run finished; nothing is left to resume
+            if checkpoint:
+                checkpoint.clear()
+            return deduped_df, run_stats
             
         except Exception as e:
             self.logger.error(f"Error processing file: {str(e)}")
             if status_callback:
                 status_callback(f"Error: {str(e)}")
-            return None
+            # Callers that need to tell a failure from an empty result check this
+            run_stats['error'] = str(e)
+            return None, run_stats
 
     def _create_final_status_message(self, initial_count, filtered_count, 
                                    final_count, df, status_callback):
@@ -0,0 +1,336 @@
+# utils/geocoders.py
+import os
+import re
+import asyncio
+import time
+import random
+import logging
+import threading
+import functools
+import contextlib
+from abc import ABC, abstractmethod
+import pandas as pd
+from geopy.geocoders import Nominatim
+from geopy.adapters import AioHTTPAdapter
+from utils.address_normalizer import canonical_address, clean_address
+
+
+class GeocoderBackend(ABC):
+    """Base class for geocoder backends returning Address/City/State/Zipcode components."""
+
+    name = None
+
+    # Remote services are paced by the standardizer's rate limiter
+    rate_limited = False
+    
+    # Starting rate, the ceiling adaptive pacing may raise it to, and retry wait
+    requests_per_second = 1.0
+    max_requests_per_second = 1.0
+    error_wait = 5.0
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    @abstractmethod
+    def geocode_one(self, address):
+        """Return components for one address, or None if it cannot be resolved."""
+
+    def geocode_many(self, addresses):
+        """Return {address: components or None} for a batch of addresses."""
+        return {address: self.geocode_one(address) for address in addresses}
+
+    async def ageocode_one(self, address):
+        """Async geocode_one; blocking backends run on a worker thread."""
+        return await asyncio.to_thread(self.geocode_one, address)
+
+    @contextlib.asynccontextmanager
+    async def async_session(self):
+        """Yield the async lookup for one batch; backends with connections scope them to it."""
+        yield self.ageocode_one
+
+
+class NominatimBackend(GeocoderBackend):
+    """OpenStreetMap Nominatim via geopy (network, rate limited)."""
+
+    name = 'nominatim'
+    rate_limited = True
+    public_domain = 'nominatim.openstreetmap.org'
+
+    def __init__(self, user_agent=None, timeout=None, domain=None, scheme=None):
+        super().__init__()
+        self.user_agent = user_agent or os.getenv('NOMINATIM_USER_AGENT')
+        if not self.user_agent:
+            raise ValueError("NOMINATIM_USER_AGENT not found in environment variables")
+        self.timeout = float(timeout or os.getenv('NOMINATIM_TIMEOUT', '10'))
+        self.domain = domain or os.getenv('NOMINATIM_DOMAIN', self.public_domain)
+        self.scheme = scheme or os.getenv('NOMINATIM_SCHEME', 'https')
+        
+        # The public service allows 1 request per second; our own server is
+        # limited only by what it can take, so it starts faster and adapts
+        self.self_hosted = self.domain != self.public_domain
+        if self.self_hosted:
+            self.requests_per_second = float(os.getenv('NOMINATIM_REQUESTS_PER_SECOND', '10'))
+            self.max_requests_per_second = float(os.getenv('NOMINATIM_MAX_REQUESTS_PER_SECOND', '200'))
+            self.error_wait = float(os.getenv('NOMINATIM_ERROR_WAIT', '0.5'))
+
+        # Initialize thread-local storage for geocoders
+        self._thread_local = threading.local()
+
+    @property
+    def geolocator(self):
+        """Thread-safe geolocator instance with rotating user agents."""
+        if not hasattr(self._thread_local, 'geolocator'):
+            thread_id = threading.get_ident()
+            user_agent = f"{self.user_agent}_{thread_id}_{random.randint(1000, 9999)}"
+
+            self._thread_local.geolocator = Nominatim(
+                user_agent=user_agent,
+                timeout=self.timeout,
+                domain=self.domain,
+                scheme=self.scheme
+            )
+        return self._thread_local.geolocator
+
+    def geocode_one(self, address):
+        """Geocode one address; geopy errors propagate so callers can retry."""
+        location = self.geolocator.geocode(
+            address,
+            addressdetails=True,
+            language='en',
+            exactly_one=True
+        )
+        if location and location.raw.get('address'):
+            return self.extract_components(location.raw['address'])
+        return None
+
+    async def ageocode_one(self, address):
+        """Geocode one address over a short-lived aiohttp session."""
+        async with self.async_session() as ageocode:
+            return await ageocode(address)
+
+    @contextlib.asynccontextmanager
+    async def async_session(self):
+        """Open an aiohttp session for one batch; concurrent batches each get their own."""
+        geolocator = Nominatim(
+            user_agent=self.user_agent,
+            timeout=self.timeout,
+            domain=self.domain,
+            scheme=self.scheme,
+            adapter_factory=AioHTTPAdapter
+        )
+        async with geolocator:
+            yield functools.partial(self._ageocode_with, geolocator)
+
+    async def _ageocode_with(self, geolocator, address):
+        """Geocode one address on an open async geolocator."""
+        location = await geolocator.geocode(
+            address,
+            addressdetails=True,
+            language='en',
+            exactly_one=True
+        )
+        if location and location.raw.get('address'):
+            return self.extract_components(location.raw['address'])
+        return None
+
+    @staticmethod
+    def extract_components(address_parts):
+        """Extract address components from a Nominatim address payload."""
+        # Extract house number and street
+        house_number = address_parts.get('house_number', '')
+        street = address_parts.get('road', '') or address_parts.get('street', '')
+
+        if house_number and street:
+            street_address = f"{house_number} {street}"
+        else:
+            street_address = street or house_number
+
+        # Get city with multiple fallbacks
+        city = (address_parts.get('city') or
+               address_parts.get('town') or
+               address_parts.get('village') or
+               address_parts.get('suburb') or
+               address_parts.get('neighbourhood'))
+
+        # Get state and postal code
+        state = address_parts.get('state', '')
+        postal_code = address_parts.get('postcode', '')
+
+        # Clean and standardize components
+        components = {
+            'Address': street_address.strip(),
+            'City': city.strip() if city else '',
+            'State': state.strip() if state else '',
+            'Zipcode': postal_code.strip() if postal_code else ''
+        }
+
+        # Validate components
+        if all(components.values()):
+            return components
+        return None
+
+
+class LocalReferenceBackend(GeocoderBackend):
+    """Offline lookups against a CSV/Parquet reference table of known addresses."""
+
+    name = 'local'
+    columns = ['Address', 'City', 'State', 'Zipcode']
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path or os.getenv('LOCAL_REFERENCE_PATH', 'data/reference/nyc_addresses.parquet')
+        self._zip_pattern = re.compile(r'\b(\d{5})(?:-\d{4})?\s*$')
+
+        # Indexes: full address key, and street + ZIP key for looser matches.
+        # Built on the first lookup so opening the backend stays cheap
+        self._by_address = None
+        self._by_street_zip = None
+        self._load_lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        """Build the lookup indexes once, on first use."""
+        if self._by_address is None:
+            with self._load_lock:
+                if self._by_address is None:
+                    self._load_reference()
+
+    def _load_reference(self):
+        """Read the reference table and build the lookup indexes."""
+        if self.path.endswith('.parquet'):
+            reference = pd.read_parquet(self.path, columns=self.columns)
+        else:
+            reference = pd.read_csv(self.path, usecols=self.columns, dtype=str)
+
+        reference = reference.fillna('').astype(str).apply(lambda col: col.str.strip())
+        reference['Zipcode'] = reference['Zipcode'].str[:5].str.zfill(5)
+        reference = reference[reference['Address'] != '']
+
+        by_address = {}
+        by_street_zip = {}
+        for row in reference.itertuples(index=False):
+            components = {
+                'Address': row.Address,
+                'City': row.City,
+                'State': row.State,
+                'Zipcode': row.Zipcode
+            }
+            full_key = self._normalize(f"{row.Address}, {row.City}, {row.State} {row.Zipcode}")
+            by_address.setdefault(full_key, components)
+            by_street_zip.setdefault((self._normalize(row.Address), row.Zipcode), components)
+
+        # Publish the street index first; _by_address marks the load complete
+        self._by_street_zip = by_street_zip
+        self._by_address = by_address
+        self.logger.info(f"Loaded {len(by_address)} reference addresses from {self.path}")
+
+    @staticmethod
+    def _normalize(text):
+        """Lookup key: the canonical form the address cache keys on."""
+        return canonical_address(clean_address(str(text)))
+
+    def geocode_one(self, address):
+        """Look an address up by its full text, then by street and ZIP."""
+        if not address:
+            return None
+        self._ensure_loaded()
+        components = self._by_address.get(self._normalize(address))
+        if components is None:
+            zip_match = self._zip_pattern.search(address)
+            if zip_match:
+                street = self._normalize(address.split(',')[0])
+                components = self._by_street_zip.get((street, zip_match.group(1)))
+        return dict(components) if components else None
+
+    def geocode_many(self, addresses):
+        """Batch lookup: each distinct address is normalized and matched once."""
+        self._ensure_loaded()
+        unique = pd.Series(list(dict.fromkeys(a for a in addresses if a)), dtype=object)
+        found = unique.map(self._normalize).map(self._by_address)
+
+        # Retry the misses on street + ZIP
+        missed = unique[found.isna()]
+        if len(missed):
+            zipcodes = missed.str.extract(self._zip_pattern, expand=False)
+            streets = missed.str.split(',').str[0].map(self._normalize)
+            found.loc[missed.index] = [
+                self._by_street_zip.get((street, zipcode)) if isinstance(zipcode, str) else None
+                for street, zipcode in zip(streets, zipcodes)
+            ]
+
+        matches = {
+            address: dict(components) if isinstance(components, dict) else None
+            for address, components in zip(unique, found)
+        }
+        return {address: matches.get(address) for address in addresses}
+
+    async def ageocode_one(self, address):
+        """In-memory lookups are cheap enough to answer on the event loop."""
+        return self.geocode_one(address)
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._by_address)
+
+
+class MockBackend(GeocoderBackend):
+    """Network-free stand-in with configurable latency, for load testing."""
+
+    name = 'mock'
+
+    def __init__(self, latency=None, jitter=None, failure_rate=None):
+        super().__init__()
+        self.latency = float(latency if latency is not None
+                             else os.getenv('MOCK_GEOCODER_LATENCY', '0.05'))
+        self.jitter = float(jitter if jitter is not None
+                            else os.getenv('MOCK_GEOCODER_JITTER', '0'))
+        self.failure_rate = float(failure_rate if failure_rate is not None
+                                  else os.getenv('MOCK_GEOCODER_FAILURE_RATE', '0'))
+        self._pattern = re.compile(r'^(.*?),\s*([^,]+),\s*([A-Za-z ]+?)\s*(\d{5})?$')
+
+    def _delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def geocode_one(self, address):
+        """Sleep for the configured latency and echo the address back as components."""
+        time.sleep(self._delay())
+        return self._respond(address)
+
+    async def ageocode_one(self, address):
+        """Async variant that awaits the simulated latency."""
+        await asyncio.sleep(self._delay())
+        return self._respond(address)
+
+    def _respond(self, address):
+        """Parse the address into components, failing at the configured rate."""
+        if not address or random.random() < self.failure_rate:
+            return None
+        match = self._pattern.match(address.strip())
+        if not match:
+            return None
+        return {
+            'Address': match.group(1).strip(),
+            'City': match.group(2).strip(),
+            'State': match.group(3).strip(),
+            'Zipcode': match.group(4) or '00000'
+        }
+
+
+GEOCODER_BACKENDS = {}
+
+
+def register_geocoder(backend_class):
+    """Register a GeocoderBackend subclass under its name."""
+    GEOCODER_BACKENDS[backend_class.name] = backend_class
+    return backend_class
+
+
+for _backend in (NominatimBackend, LocalReferenceBackend, MockBackend):
+    register_geocoder(_backend)
+
+
+def open_geocoder(backend=None, **kwargs):
+    """Open the configured geocoder backend (nominatim by default)."""
+    backend = (backend or os.getenv('GEOCODER_BACKEND') or 'nominatim').lower()
+    if backend not in GEOCODER_BACKENDS:
+        raise ValueError(f"Unknown geocoder backend: {backend}")
+    return GEOCODER_BACKENDS[backend](**kwargs)
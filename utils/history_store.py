@@ -0,0 +1,149 @@
+# utils/history_store.py
+import os
+import json
+import logging
+from datetime import datetime
+import pandas as pd
+
+
+class HistoryStore:
+    """Processed output storage as typed, columnar Parquet files."""
+
+    def __init__(self, output_dir="data/outputs"):
+        self.output_dir = output_dir
+        self.logger = logging.getLogger(__name__)
+
+        # Legacy runs were written as CSV and stay readable
+        self.extensions = ('.parquet', '.csv')
+        
+        # Append-only metadata index written alongside each output
+        self.index_path = os.path.join(output_dir, "history_index.jsonl")
+        
+        # Last listing, reused until the directory or the index changes
+        self._listing = None
+
+    def _path(self, filename):
+        return os.path.join(self.output_dir, filename)
+
+    @staticmethod
+    def prepare_output_types(df):
+        """Apply the stored column types to a processed DataFrame."""
+        df = df.copy()
+        if 'Property class' in df.columns:
+            df['Property class'] = df['Property class'].astype('category')
+        if 'Sale date' in df.columns:
+            df['Sale date'] = pd.to_datetime(df['Sale date'], errors='coerce')
+        if 'Zipcode' in df.columns:
+            df['Zipcode'] = df['Zipcode'].astype('string')
+
+        # Parquet needs one type per column; store mixed object columns as text
+        for col in df.columns[df.dtypes == object]:
+            if pd.api.types.infer_dtype(df[col], skipna=True) in ('mixed', 'mixed-integer'):
+                df[col] = df[col].astype('string')
+        return df
+
+    def save(self, df, base_name):
+        """Write a processed DataFrame as Parquet and return its filename."""
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            filename = f"{base_name}.parquet"
+            self.prepare_output_types(df).to_parquet(self._path(filename), index=False)
+            self._append_index_entry(filename, df)
+            return filename
+        except Exception as e:
+            self.logger.error(f"Error saving processed output: {str(e)}")
+            raise
+
+    def load(self, filename):
+        """Load a stored output, Parquet or legacy CSV."""
+        path = self._path(filename)
+        if filename.endswith('.csv'):
+            return pd.read_csv(path)
+        return pd.read_parquet(path)
+
+    def _append_index_entry(self, filename, df):
+        """Record metadata for a newly written output in the history index."""
+        class_distribution = {}
+        if 'Property class' in df.columns:
+            class_distribution = {
+                str(cls): int(count)
+                for cls, count in df['Property class'].value_counts().items()
+            }
+        entry = {
+            'filename': filename,
+            'rows': len(df),
+            'class_distribution': class_distribution,
+            'size_bytes': os.path.getsize(self._path(filename)),
+            'timestamp': datetime.now().timestamp()
+        }
+        try:
+            with open(self.index_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        except Exception as e:
+            self.logger.error(f"Error updating history index: {str(e)}")
+
+    def _listing_signature(self):
+        """Modification stamps of the output directory and the index."""
+        signature = [os.stat(self.output_dir).st_mtime_ns]
+        if os.path.exists(self.index_path):
+            stat = os.stat(self.index_path)
+            signature += [stat.st_mtime_ns, stat.st_size]
+        return tuple(signature)
+
+    def _read_index(self):
+        """Index entries by filename, skipping malformed lines."""
+        entries = {}
+        if not os.path.exists(self.index_path):
+            return entries
+        try:
+            with open(self.index_path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Skip a torn or corrupt line rather than losing later entries
+                        continue
+                    if entry.get('filename'):
+                        entries[entry['filename']] = entry
+        except Exception as e:
+            self.logger.error(f"Error reading history index: {str(e)}")
+        return entries
+
+    def list_entries(self):
+        """List history metadata newest first without opening any output."""
+        if not os.path.exists(self.output_dir):
+            return []
+        
+        # Reruns reuse the last listing until a file is added or the index grows
+        signature = self._listing_signature()
+        if self._listing is not None and self._listing[0] == signature:
+            return list(self._listing[1])
+        
+        present = {f for f in os.listdir(self.output_dir) if f.endswith(self.extensions)}
+        entries = {
+            filename: entry for filename, entry in self._read_index().items()
+            if filename in present
+        }
+        
+        # Outputs written before the index existed get file-system metadata only
+        for filename in present - set(entries):
+            path = self._path(filename)
+            entries[filename] = {
+                'filename': filename,
+                'rows': None,
+                'class_distribution': {},
+                'size_bytes': os.path.getsize(path),
+                'timestamp': os.path.getmtime(path)
+            }
+        
+        listing = sorted(entries.values(), key=lambda e: e['timestamp'], reverse=True)
+        self._listing = (signature, listing)
+        return list(listing)
+
+    @staticmethod
+    def csv_filename(filename):
+        """Download name for a stored output."""
+        return f"{os.path.splitext(filename)[0]}.csv"
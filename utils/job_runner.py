@@ -0,0 +1,186 @@
+# utils/job_runner.py
+import io
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobStore:
+    """Thread-safe in-memory store of processing job state."""
+
+    # Statuses a job can no longer leave
+    finished_statuses = ('completed', 'failed')
+
+    def __init__(self, max_jobs=200):
+        self.max_jobs = max_jobs
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+
+    def create(self, job_id, **fields):
+        """Register a new queued job."""
+        with self._lock:
+            self._jobs[job_id] = {
+                'id': job_id,
+                'status': 'queued',
+                'stage': 'Queued',
+                'message': '',
+                'percent': 0.0,
+                'eta_seconds': None,
+                'run_stats': None,
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                **fields
+            }
+            self._prune()
+
+    def update(self, job_id, **fields):
+        """Update fields on an existing job."""
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+                if fields.get('status') in self.finished_statuses:
+                    self._finished.notify_all()
+
+    def wait(self, job_id, timeout):
+        """Block until a job finishes or timeout seconds pass; return its snapshot."""
+        with self._finished:
+            self._finished.wait_for(
+                lambda: self._jobs.get(job_id, {}).get('status', 'failed') in self.finished_statuses,
+                timeout
+            )
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get(self, job_id):
+        """Return a snapshot of a job, or None if it is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def find_latest(self, key, statuses=None):
+        """Return the most recently created job for a result key, optionally by status."""
+        with self._lock:
+            jobs = [
+                job for job in self._jobs.values()
+                if job.get('key') == key and (statuses is None or job['status'] in statuses)
+            ]
+            if not jobs:
+                return None
+            return dict(max(jobs, key=lambda job: job['created_at']))
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond max_jobs; caller must hold the lock."""
+        finished = sorted(
+            (job for job in self._jobs.values() if job['status'] in self.finished_statuses),
+            key=lambda job: job['created_at']
+        )
+        excess = len(self._jobs) - self.max_jobs
+        for job in finished[:max(excess, 0)]:
+            del self._jobs[job['id']]
+
+
+class JobRunner:
+    """Run the processing pipeline on a local worker pool with progress tracking."""
+
+    # Jobs an identical upload may attach to instead of starting over; failed
+    # jobs and completed jobs that saved no result are not reused, so a new
+    # upload of the same file runs again
+    reusable_statuses = ('queued', 'running', 'completed')
+
+    # Share of the progress bar covered by address standardization
+    standardize_start = 10.0
+    standardize_end = 95.0
+
+    def __init__(self, data_processor, max_workers=2, store=None):
+        self.data_processor = data_processor
+        self.store = store or JobStore()
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def submit(self, file_bytes, filename, key=None, on_complete=None, force=False):
+        """Queue a workbook for processing and return its job id."""
+        # Reuse the latest live or completed job for the same upload unless a retry is forced
+        if key and not force:
+            existing = self.store.find_latest(key, self.reusable_statuses)
+            if existing and (existing['status'] != 'completed' or existing['result']):
+                return existing['id']
+
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, filename=filename, key=key)
+        self._executor.submit(self._run, job_id, file_bytes, on_complete)
+        return job_id
+
+    def get(self, job_id):
+        """Return a snapshot of a job's state."""
+        return self.store.get(job_id)
+
+    def wait(self, job_id, timeout):
+        """Wait up to timeout seconds for a job to finish, returning early when it does."""
+        return self.store.wait(job_id, timeout)
+
+    def _run(self, job_id, file_bytes, on_complete):
+        """Worker body: run the pipeline and record progress in the store."""
+        started_at = time.time()
+        self.store.update(job_id, status='running', stage='Loading data', started_at=started_at)
+        standardize_started = {}
+
+        def status_callback(message):
+            self.store.update(job_id, message=message)
+
+        def progress_callback(completed, total):
+            now = time.time()
+            if 'at' not in standardize_started:
+                standardize_started.update(at=now, completed=completed)
+
+            # ETA from the rate of addresses finished since standardization began
+            eta_seconds = None
+            done_here = completed - standardize_started['completed']
+            if done_here > 0 and total > completed:
+                rate = done_here / max(now - standardize_started['at'], 1e-6)
+                eta_seconds = (total - completed) / rate
+
+            fraction = completed / total if total else 1.0
+            span = self.standardize_end - self.standardize_start
+            self.store.update(
+                job_id,
+                stage=f"Standardizing addresses ({completed}/{total})",
+                percent=self.standardize_start + span * fraction,
+                eta_seconds=eta_seconds
+            )
+
+        try:
+            processed_df, run_stats = self.data_processor.process_file_with_stats(
+                io.BytesIO(file_bytes), status_callback, progress_callback,
+                run_id=self.store.get(job_id)['key']
+            )
+            # The pipeline reports its own errors in the stats instead of raising
+            if run_stats.get('error'):
+                raise RuntimeError(run_stats['error'])
+            result = None
+            if on_complete:
+                result = on_complete(self.store.get(job_id), processed_df, run_stats)
+            self.store.update(
+                job_id,
+                status='completed',
+                result=result,
+                stage='Complete',
+                percent=100.0,
+                eta_seconds=0,
+                run_stats=run_stats,
+                finished_at=time.time()
+            )
+        except Exception as e:
+            self.logger.error(f"Job {job_id} failed: {str(e)}")
+            self.store.update(
+                job_id,
+                status='failed',
+                stage='Failed',
+                error=str(e),
+                finished_at=time.time()
+            )
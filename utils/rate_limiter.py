@@ -0,0 +1,125 @@
+# utils/rate_limiter.py
+import asyncio
+import logging
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every geocoding worker."""
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("Rate must be greater than zero")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """Add the tokens accrued since the last update."""
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def set_rate(self, rate):
+        """Change the refill rate, keeping the tokens accrued so far."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def _take_or_wait(self, tokens):
+        """Take tokens if available (returning 0) or return the seconds to wait."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available and return the seconds waited."""
+        waited = 0.0
+        while True:
+            wait = self._take_or_wait(tokens)
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens=1):
+        """Await tokens without blocking the event loop; return the seconds waited."""
+        waited = 0.0
+        while True:
+            wait = self._take_or_wait(tokens)
+            if not wait:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+class AimdRateController:
+    """Additive-increase/multiplicative-decrease control of a TokenBucket's rate.
+
+    Only the rate adapts; concurrency stays at the caller's worker or semaphore
+    limit, so throughput tops out near workers / request latency.
+    """
+
+    def __init__(self, bucket, min_rate, max_rate, increase=5.0, decrease=0.5,
+                 latency_tolerance=2.0, cooldown=1.0):
+        self.bucket = bucket
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.logger = logging.getLogger(__name__)
+
+        self._smoothed = None
+        self._baseline = None
+        self._last_decrease = 0.0
+        
+        # Double the rate every second until the first back-off, then go additive
+        self._slow_start = True
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def record_success(self, latency):
+        """Raise the rate unless latency is growing."""
+        with self._lock:
+            self._smoothed = latency if self._smoothed is None else 0.8 * self._smoothed + 0.2 * latency
+            if self._baseline is None or self._smoothed < self._baseline:
+                self._baseline = self._smoothed
+            else:
+                # Let the baseline drift up slowly if the server gets slower for good
+                self._baseline = 0.999 * self._baseline + 0.001 * self._smoothed
+
+            if self._smoothed > self._baseline * self.latency_tolerance:
+                self._back_off("latency growth")
+            else:
+                rate = self.bucket.rate
+                step = 1.0 if self._slow_start else self.increase / rate
+                self.bucket.set_rate(min(self.max_rate, rate + step))
+
+    def record_failure(self, reason):
+        """Cut the rate after a throttling response or timeout."""
+        with self._lock:
+            self._back_off(reason)
+
+    def _back_off(self, reason):
+        """Multiplicative decrease, at most once per cooldown; caller must hold the lock."""
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        rate = max(self.min_rate, self.bucket.rate * self.decrease)
+        self.bucket.set_rate(rate)
+        self.logger.info(f"Geocoding rate reduced to {rate:.1f}/s after {reason}")
+
@@ -0,0 +1,172 @@
+# utils/request_scheduler.py
+import time
+import random
+import asyncio
+import logging
+import threading
+from geopy.exc import (
+    GeocoderRateLimited, GeocoderQuotaExceeded, GeocoderTimedOut,
+    GeocoderUnavailable, GeocoderServiceError
+)
+from utils.rate_limiter import TokenBucket, AimdRateController
+
+
+class RequestFailed(Exception):
+    """The scheduler gave up on a request without getting an answer from the service."""
+
+
+class RequestMetrics:
+    """Thread-safe request counters for one scope: a scheduler or a single run."""
+
+    def __init__(self):
+        self._counts = {
+            'requests': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'retries': 0,
+            'request_seconds': 0.0,
+            'pacing_wait_seconds': 0.0,
+            'backoff_seconds': 0.0,
+            'errors': {}
+        }
+        self._lock = threading.Lock()
+
+    def record(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._counts[name] += value
+
+    def record_error(self, name):
+        with self._lock:
+            self._counts['errors'][name] = self._counts['errors'].get(name, 0) + 1
+
+    def snapshot(self):
+        """Copy of the counters."""
+        with self._lock:
+            snapshot = dict(self._counts)
+            snapshot['errors'] = dict(self._counts['errors'])
+        return snapshot
+
+
+class RequestScheduler:
+    """Single owner of geocoding request pacing, retries, backoff and metrics."""
+
+    # Handling per error class, checked in order: (errors, retry, throttle signal)
+    error_classes = [
+        ((GeocoderRateLimited, GeocoderQuotaExceeded), True, True),
+        ((GeocoderTimedOut, GeocoderUnavailable), True, True),
+        ((GeocoderServiceError,), False, False),
+    ]
+
+    def __init__(self, rate, max_rate=None, max_retries=5, error_wait=5.0,
+                 max_backoff=60.0, paced=True):
+        self.max_retries = max_retries
+        self.error_wait = error_wait
+        self.max_backoff = max_backoff
+        self.paced = paced
+        self.logger = logging.getLogger(__name__)
+
+        # One token bucket for every thread and task; AIMD only when there is headroom
+        self.bucket = TokenBucket(rate)
+        self.controller = None
+        if max_rate and max_rate > rate:
+            self.controller = AimdRateController(
+                self.bucket,
+                min_rate=min(1.0, rate),
+                max_rate=max_rate
+            )
+
+        # Process-wide totals; callers pass their own RequestMetrics for per-run figures
+        self._metrics = RequestMetrics()
+
+    def _classify(self, error):
+        """Return (retry, throttle) for an error raised by a request."""
+        for errors, retry, throttle in self.error_classes:
+            if isinstance(error, errors):
+                return retry, throttle
+        return False, False
+
+    def _backoff(self, error, attempt):
+        """Exponential backoff with jitter, honouring (but capping) a server's Retry-After."""
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            return min(self.max_backoff, float(retry_after))
+        delay = min(self.max_backoff, self.error_wait * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _record(self, metrics, **increments):
+        """Add to the scheduler totals and to the caller's metrics, if any."""
+        self._metrics.record(**increments)
+        if metrics is not None:
+            metrics.record(**increments)
+
+    def _on_success(self, latency, metrics):
+        self._record(metrics, requests=1, succeeded=1, request_seconds=latency)
+        if self.controller:
+            self.controller.record_success(latency)
+
+    def _on_error(self, error, attempt, latency, metrics):
+        """Record a failed attempt; return the backoff before retrying, or None to give up."""
+        retry, throttle = self._classify(error)
+        name = type(error).__name__
+        self._record(metrics, requests=1, request_seconds=latency)
+        for scope in (self._metrics, metrics):
+            if scope is not None:
+                scope.record_error(name)
+        if throttle and self.controller:
+            self.controller.record_failure(name)
+
+        if retry and attempt < self.max_retries - 1:
+            self._record(metrics, retries=1)
+            return self._backoff(error, attempt)
+
+        self._record(metrics, failed=1)
+        if not retry:
+            self.logger.error(f"Geocoding error: {str(error)}")
+        return None
+
+    def call(self, func, *args, metrics=None):
+        """Run a blocking request under the schedule; raises RequestFailed when it gives up."""
+        for attempt in range(self.max_retries):
+            if self.paced:
+                self._record(metrics, pacing_wait_seconds=self.bucket.acquire())
+            started = time.monotonic()
+            try:
+                result = func(*args)
+            except Exception as e:
+                delay = self._on_error(e, attempt, time.monotonic() - started, metrics)
+                if delay is None:
+                    raise RequestFailed(str(e)) from e
+                time.sleep(delay)
+                self._record(metrics, backoff_seconds=delay)
+                continue
+            self._on_success(time.monotonic() - started, metrics)
+            return result
+
+    async def acall(self, func, *args, metrics=None):
+        """Await a coroutine request under the same schedule as call()."""
+        for attempt in range(self.max_retries):
+            if self.paced:
+                self._record(metrics, pacing_wait_seconds=await self.bucket.acquire_async())
+            started = time.monotonic()
+            try:
+                result = await func(*args)
+            except Exception as e:
+                delay = self._on_error(e, attempt, time.monotonic() - started, metrics)
+                if delay is None:
+                    raise RequestFailed(str(e)) from e
+                await asyncio.sleep(delay)
+                self._record(metrics, backoff_seconds=delay)
+                continue
+            self._on_success(time.monotonic() - started, metrics)
+            return result
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def metrics(self):
+        """Snapshot of the cumulative, process-wide request metrics."""
+        snapshot = self._metrics.snapshot()
+        snapshot['rate'] = self.bucket.rate
+        return snapshot
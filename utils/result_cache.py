@@ -0,0 +1,64 @@
+# utils/result_cache.py
+import logging
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """LRU cache of processed results, bounded by entry count and memory."""
+
+    def __init__(self, max_entries=8, max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def get(self, key, default=None):
+        """Return a cached result and mark it most recently used."""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, df, *extra):
+        """Cache a processed DataFrame plus any extra values under key."""
+        size = int(df.memory_usage(deep=True).sum()) if df is not None else 0
+        if size > self.max_bytes:
+            self.logger.info(f"Result {key[:12]} ({size} bytes) exceeds the cache limit; not cached")
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (df, *extra)
+            self._sizes[key] = size
+            self._total_bytes += size
+
+            # Evict least recently used results until both limits hold
+            while (len(self._entries) > self.max_entries or
+                   self._total_bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.logger.info(f"Evicted cached result {oldest[:12]}")
+
+    def _remove(self, key):
+        """Drop a key; caller must hold the lock."""
+        del self._entries[key]
+        self._total_bytes -= self._sizes.pop(key)
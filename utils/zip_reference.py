@@ -0,0 +1,360 @@
+# utils/zip_reference.py
+import os
+import re
+import sqlite3
+import logging
+import pandas as pd
+
+
+# USPS state, territory and military codes
+STATE_NAMES = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas',
+    'CA': 'California', 'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware',
+    'DC': 'District of Columbia', 'FL': 'Florida', 'GA': 'Georgia', 'HI': 'Hawaii',
+    'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa',
+    'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine',
+    'MD': 'Maryland', 'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota',
+    'MS': 'Mississippi', 'MO': 'Missouri', 'MT': 'Montana', 'NE': 'Nebraska',
+    'NV': 'Nevada', 'NH': 'New Hampshire', 'NJ': 'New Jersey', 'NM': 'New Mexico',
+    'NY': 'New York', 'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio',
+    'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island',
+    'SC': 'South Carolina', 'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas',
+    'UT': 'Utah', 'VT': 'Vermont', 'VA': 'Virginia', 'WA': 'Washington',
+    'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming',
+    # Territories and freely associated states
+    'AS': 'American Samoa', 'GU': 'Guam', 'MP': 'Northern Mariana Islands',
+    'PR': 'Puerto Rico', 'VI': 'U.S. Virgin Islands', 'FM': 'Federated States of Micronesia',
+    'MH': 'Marshall Islands', 'PW': 'Palau',
+    # Military mail
+    'AA': 'Armed Forces Americas', 'AE': 'Armed Forces Europe', 'AP': 'Armed Forces Pacific',
+}
+
+# ZIP3 prefix ranges (inclusive) by state
+STATE_ZIP3_RANGES = {
+    'PR': [(6, 7), (9, 9)], 'VI': [(8, 8)],
+    'MA': [(10, 27), (55, 55)], 'RI': [(28, 29)], 'NH': [(30, 38)], 'ME': [(39, 49)],
+    'VT': [(50, 54), (56, 59)], 'CT': [(60, 69)], 'NJ': [(70, 89)], 'AE': [(90, 98)],
+    'NY': [(5, 5), (100, 149)], 'PA': [(150, 196)], 'DE': [(197, 199)],
+    'DC': [(200, 200), (202, 205), (569, 569)], 'VA': [(201, 201), (220, 246)],
+    'MD': [(206, 219)], 'WV': [(247, 268)], 'NC': [(270, 289)], 'SC': [(290, 299)],
+    'GA': [(300, 319), (398, 399)], 'FL': [(320, 339), (341, 349)], 'AA': [(340, 340)],
+    'AL': [(350, 369)], 'TN': [(370, 385)], 'MS': [(386, 397)], 'KY': [(400, 427)],
+    'OH': [(430, 459)], 'IN': [(460, 479)], 'MI': [(480, 499)], 'IA': [(500, 528)],
+    'WI': [(530, 549)], 'MN': [(550, 567)], 'SD': [(570, 577)], 'ND': [(580, 588)],
+    'MT': [(590, 599)], 'IL': [(600, 629)], 'MO': [(630, 658)], 'KS': [(660, 679)],
+    'NE': [(680, 693)], 'LA': [(700, 714)], 'AR': [(716, 729)], 'OK': [(730, 732), (734, 749)],
+    'TX': [(733, 733), (750, 799), (885, 885)], 'CO': [(800, 816)], 'WY': [(820, 831)],
+    'ID': [(832, 838)], 'UT': [(840, 847)], 'AZ': [(850, 865)], 'NM': [(870, 884)],
+    'NV': [(889, 898)], 'CA': [(900, 961)], 'AP': [(962, 966)], 'HI': [(967, 968)],
+    'GU': [(969, 969)], 'OR': [(970, 979)], 'WA': [(980, 994)], 'AK': [(995, 999)],
+}
+
+# Individual ZIPs whose state differs from their prefix
+ZIP5_STATE_RANGES = {
+    'AS': [(96799, 96799)],
+    'PW': [(96940, 96940)],
+    'FM': [(96941, 96944)],
+    'MP': [(96950, 96952)],
+    'MH': [(96960, 96970)],
+}
+
+# NYC ZIP ranges by borough, the default city for each, and the city names USPS accepts
+NYC_BOROUGH_ZIP_RANGES = {
+    'Manhattan': [(10001, 10282)],
+    'Staten Island': [(10301, 10314)],
+    'Bronx': [(10451, 10475)],
+    'Brooklyn': [(11201, 11256)],
+    # 11500-11599 is Nassau County, between the Queens blocks
+    'Queens': [(11004, 11005), (11101, 11109), (11351, 11499), (11690, 11697)],
+}
+
+# Queens mail uses neighbourhood names, so there is no single default city
+BOROUGH_DEFAULT_CITY = {
+    'Manhattan': 'New York',
+    'Staten Island': 'Staten Island',
+    'Bronx': 'Bronx',
+    'Brooklyn': 'Brooklyn',
+    'Queens': None,
+}
+
+QUEENS_CITIES = {
+    'Arverne', 'Astoria', 'Bayside', 'Bellerose', 'Breezy Point', 'Cambria Heights',
+    'College Point', 'Corona', 'Douglaston', 'East Elmhurst', 'Elmhurst', 'Far Rockaway',
+    'Floral Park', 'Flushing', 'Forest Hills', 'Fresh Meadows', 'Glen Oaks', 'Glendale',
+    'Hollis', 'Howard Beach', 'Jackson Heights', 'Jamaica', 'Kew Gardens', 'Little Neck',
+    'Long Island City', 'Maspeth', 'Middle Village', 'Oakland Gardens', 'Ozone Park',
+    'Queens Village', 'Rego Park', 'Richmond Hill', 'Ridgewood', 'Rockaway Beach',
+    'Rockaway Park', 'Rosedale', 'Saint Albans', 'South Ozone Park', 'South Richmond Hill',
+    'Springfield Gardens', 'Sunnyside', 'Whitestone', 'Woodhaven', 'Woodside',
+}
+
+BOROUGH_CITIES = {
+    'Manhattan': {'New York', 'New York City', 'Manhattan', 'NYC'},
+    'Staten Island': {'Staten Island'},
+    'Bronx': {'Bronx', 'The Bronx'},
+    'Brooklyn': {'Brooklyn'},
+    'Queens': {'Queens'} | QUEENS_CITIES,
+}
+
+# Bump when the bundled tables change so existing indexes are rebuilt
+BUNDLE_VERSION = 2
+
+
+class ZipReference:
+    """Offline ZIP/city/state/borough index kept in SQLite and served from memory."""
+
+    # Confidence weights; a score of 1.0 means every check agreed
+    weights = {
+        'zip_format': 0.1,
+        'house_number': 0.2,
+        'zip_state': 0.4,
+        'zip_city': 0.3,
+    }
+
+    def __init__(self, db_path=None, csv_path=None):
+        self.db_path = db_path or os.getenv('ZIP_REFERENCE_DB', 'data/reference/zip_reference.sqlite')
+        self.csv_path = csv_path or os.getenv('ZIP_REFERENCE_CSV')
+        self.logger = logging.getLogger(__name__)
+        self._zip_pattern = re.compile(r'^\d{5}(?:-\d{4})?$')
+        self._house_number = re.compile(r'^\d+[A-Za-z]?(?:-\d+)?\s')
+
+        self._state_codes = {code.lower(): code for code in STATE_NAMES}
+        self._state_codes.update({name.lower(): code for code, name in STATE_NAMES.items()})
+        self._borough_cities = {
+            borough: {city.lower() for city in cities}
+            for borough, cities in BOROUGH_CITIES.items()
+        }
+
+        try:
+            self._ensure_index()
+            self._load_index()
+        except Exception as e:
+            # Fall back to the bundled tables without a persistent index
+            self.logger.error(f"Error opening ZIP reference index: {str(e)}")
+            self.db_path = ':memory:'
+            self._ensure_index()
+            self._load_index()
+
+    # Index build
+
+    def _bundled_zips(self):
+        """ZIP-level rows from the bundled tables: (zipcode, city, state, borough)."""
+        rows = {}
+        for state, ranges in ZIP5_STATE_RANGES.items():
+            for start, end in ranges:
+                for zipcode in range(start, end + 1):
+                    rows[f"{zipcode:05d}"] = (f"{zipcode:05d}", None, state, None)
+        for borough, ranges in NYC_BOROUGH_ZIP_RANGES.items():
+            for start, end in ranges:
+                for zipcode in range(start, end + 1):
+                    rows[f"{zipcode:05d}"] = (
+                        f"{zipcode:05d}", BOROUGH_DEFAULT_CITY[borough], 'NY', borough
+                    )
+        return rows
+
+    def _csv_zips(self):
+        """ZIP rows from the optional full ZIP CSV (zip, city, state columns)."""
+        reference = pd.read_csv(self.csv_path, dtype=str)
+        reference.columns = [col.strip().lower() for col in reference.columns]
+        zip_col = next(col for col in ('zip', 'zipcode', 'zip_code', 'postal_code')
+                       if col in reference.columns)
+        reference = reference.rename(columns={zip_col: 'zip'})[['zip', 'city', 'state']]
+        reference['zip'] = reference['zip'].str.strip().str[:5].str.zfill(5)
+        reference['city'] = reference['city'].str.strip().str.title()
+        reference['state'] = reference['state'].str.strip().map(self.state_code)
+        reference = reference.dropna(subset=['zip', 'state']).drop_duplicates('zip')
+        return {
+            row.zip: (row.zip, row.city, row.state, None)
+            for row in reference.itertuples(index=False)
+        }
+
+    def _source_signature(self):
+        """Identify the inputs an index was built from."""
+        csv_mtime = ''
+        if self.csv_path and os.path.exists(self.csv_path):
+            csv_mtime = str(os.path.getmtime(self.csv_path))
+        return {
+            'bundle_version': str(BUNDLE_VERSION),
+            'csv_path': self.csv_path or '',
+            'csv_mtime': csv_mtime
+        }
+
+    def _ensure_index(self):
+        """Build the SQLite index if it is missing or its sources changed."""
+        if self.db_path != ':memory:':
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+
+        signature = self._source_signature()
+        try:
+            stored = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        except sqlite3.OperationalError:
+            stored = {}
+        if stored == signature:
+            return
+
+        self.logger.info(f"Building ZIP reference index at {self.db_path}")
+        zips = self._bundled_zips()
+        if self.csv_path and os.path.exists(self.csv_path):
+            # Full ZIP lists add per-ZIP cities; bundled boroughs stay authoritative for NYC
+            for zipcode, row in self._csv_zips().items():
+                borough = zips.get(zipcode, (None,) * 4)[3]
+                zips[zipcode] = (zipcode, row[1], row[2], borough)
+
+        with self._conn:
+            self._conn.executescript("""
+                DROP TABLE IF EXISTS meta;
+                DROP TABLE IF EXISTS states;
+                DROP TABLE IF EXISTS zip3_states;
+                DROP TABLE IF EXISTS zips;
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE states (code TEXT PRIMARY KEY, name TEXT NOT NULL);
+                CREATE TABLE zip3_states (zip3 TEXT PRIMARY KEY, state TEXT NOT NULL) WITHOUT ROWID;
+                CREATE TABLE zips (
+                    zipcode TEXT PRIMARY KEY, city TEXT, state TEXT NOT NULL, borough TEXT
+                ) WITHOUT ROWID;
+            """)
+            self._conn.executemany("INSERT INTO states VALUES (?, ?)", STATE_NAMES.items())
+            self._conn.executemany(
+                "INSERT INTO zip3_states VALUES (?, ?)",
+                [
+                    (f"{zip3:03d}", state)
+                    for state, ranges in STATE_ZIP3_RANGES.items()
+                    for start, end in ranges
+                    for zip3 in range(start, end + 1)
+                ]
+            )
+            self._conn.executemany("INSERT INTO zips VALUES (?, ?, ?, ?)", zips.values())
+            self._conn.executemany("INSERT INTO meta VALUES (?, ?)", signature.items())
+
+    def _load_index(self):
+        """Load the index into lookup Series for scalar and vectorized use."""
+        zip3 = pd.read_sql("SELECT zip3, state FROM zip3_states", self._conn)
+        self._zip3_states = zip3.set_index('zip3')['state']
+
+        zips = pd.read_sql("SELECT zipcode, city, state, borough FROM zips", self._conn)
+        zips = zips.set_index('zipcode')
+        self._zip_states = zips['state']
+        self._zip_cities = zips['city'].dropna()
+        self._zip_boroughs = zips['borough'].dropna()
+
+        self._zip3_state_map = self._zip3_states.to_dict()
+        self._zip_state_map = self._zip_states.to_dict()
+        self._zip_city_map = self._zip_cities.to_dict()
+        self._zip_borough_map = self._zip_boroughs.to_dict()
+        self.logger.info(f"Loaded ZIP reference with {len(zips)} ZIP entries")
+
+    # Scalar lookups
+
+    def state_code(self, state):
+        """Two-letter code for a state code or name, or None if unknown."""
+        if not state or not isinstance(state, str):
+            return None
+        return self._state_codes.get(state.strip().lower())
+
+    def state_name(self, state):
+        """Full name for a state code; other values are returned unchanged."""
+        if not isinstance(state, str):
+            return state
+        return STATE_NAMES.get(state.strip().upper(), state)
+
+    def _zip5(self, zipcode):
+        zipcode = str(zipcode or '').strip()[:5]
+        return zipcode if len(zipcode) == 5 and zipcode.isdigit() else None
+
+    def state_for_zip(self, zipcode):
+        """State code a ZIP belongs to, or None if it is not a valid ZIP."""
+        zip5 = self._zip5(zipcode)
+        if not zip5:
+            return None
+        return self._zip_state_map.get(zip5) or self._zip3_state_map.get(zip5[:3])
+
+    def city_for_zip(self, zipcode):
+        """Default city for a ZIP, when the index knows it."""
+        return self._zip_city_map.get(self._zip5(zipcode))
+
+    def borough_for_zip(self, zipcode):
+        """NYC borough for a ZIP, or None outside the city."""
+        return self._zip_borough_map.get(self._zip5(zipcode))
+
+    def city_matches_zip(self, city, zipcode):
+        """True/False when the index knows the ZIP's cities, None otherwise."""
+        city = str(city or '').strip().lower()
+        borough = self.borough_for_zip(zipcode)
+        if borough is not None:
+            return city in self._borough_cities[borough]
+        known_city = self.city_for_zip(zipcode)
+        if known_city is None:
+            return None
+        return city == known_city.lower()
+
+    def confidence(self, components):
+        """Score parsed components from 0.0 to 1.0 against the reference."""
+        if not components:
+            return 0.0
+
+        zipcode = str(components.get('Zipcode') or '').strip()
+        score = 0.0
+        if self._zip_pattern.match(zipcode):
+            score += self.weights['zip_format']
+        if self._house_number.match(str(components.get('Address') or '')):
+            score += self.weights['house_number']
+
+        zip_state = self.state_for_zip(zipcode)
+        if zip_state and zip_state == self.state_code(components.get('State')):
+            score += self.weights['zip_state']
+            
+            # Without a city table for the ZIP (no ZIP_REFERENCE_CSV outside NYC),
+            # a named city is not penalized, so state+ZIP3 agreement can clear the threshold
+            city_matches = self.city_matches_zip(components.get('City'), zipcode)
+            if city_matches or (city_matches is None and str(components.get('City') or '').strip()):
+                score += self.weights['zip_city']
+        return round(score, 3)
+
+    def is_valid(self, components):
+        """Whether components have a valid ZIP and a known state consistent with it."""
+        state = self.state_code(components.get('State'))
+        zip_state = self.state_for_zip(components.get('Zipcode'))
+        return bool(state and zip_state and state == zip_state)
+
+    # Vectorized lookups
+
+    def lookup(self, zipcodes):
+        """ZIP state, city and borough for a Series of ZIPs, aligned to its index."""
+        zip5 = zipcodes.astype(str).str.strip().str[:5]
+        zip5 = zip5.where(zip5.str.fullmatch(r'\d{5}'))
+        zip_state = zip5.map(self._zip_states).fillna(zip5.str[:3].map(self._zip3_states))
+        return pd.DataFrame({
+            'zip_state': zip_state,
+            'zip_city': zip5.map(self._zip_cities),
+            'borough': zip5.map(self._zip_boroughs)
+        }, index=zipcodes.index)
+
+    def state_codes(self, states):
+        """Two-letter codes for a Series of state codes or names (None if unknown)."""
+        return states.astype(str).str.strip().str.lower().map(self._state_codes)
+
+    def state_names(self, states):
+        """Expand state codes in a Series to full names, leaving other values as-is."""
+        names = states.astype(str).str.strip().str.upper().map(STATE_NAMES)
+        return states.where(names.isna(), names)
+
+    def enrich(self, components_df):
+        """Fill missing State/City from the ZIP and expand state names, in bulk.
+
+        Returns the enriched frame and a mask of rows whose state contradicts the ZIP.
+        """
+        enriched = components_df.copy()
+        reference = self.lookup(enriched['Zipcode'])
+
+        missing_state = enriched['State'].isna() | enriched['State'].eq('')
+        enriched['State'] = enriched['State'].mask(missing_state, reference['zip_state'])
+        missing_city = enriched['City'].isna() | enriched['City'].eq('')
+        enriched['City'] = enriched['City'].mask(missing_city, reference['zip_city'])
+
+        codes = self.state_codes(enriched['State'])
+        mismatched = (codes.notna() & reference['zip_state'].notna() &
+                      codes.ne(reference['zip_state']))
+
+        enriched['State'] = self.state_names(enriched['State'])
+        return enriched, mismatched